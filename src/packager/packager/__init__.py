@@ -1,5 +1,29 @@
+from typing import Any, TYPE_CHECKING
+
 from .types import KEYED, PseudoContext  # noqa: F401
 from .constants import Constants  # noqa: F401
-from .index import handler  # noqa: F401
+from .index import batch_handler, handler, shard_handler  # noqa: F401
 from .gsa_handler import GSAHandler  # noqa: F401
+from .extractors import Extractor, ExtractorRegistry  # noqa: F401
+from .instrumentation import Instrumentation  # noqa: F401
 from .ssm_parameter_store import SSMParameterStore  # noqa: F401
+
+if TYPE_CHECKING:
+    from .gatk_report import GatkReportStream  # noqa: F401
+    from .recal_index import RecalIndex  # noqa: F401
+
+# exports that pull in pandas load on first access, not at cold start
+LAZY = {
+    "GatkReportStream": ".gatk_report",
+    "RecalIndex": ".recal_index",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,21 +1,20 @@
 import json
-import yaml
+import shutil
 import os
+import threading
 
 from datetime import datetime
-from dotenv import load_dotenv
 from tempfile import TemporaryDirectory
 from typing import Any, Generator
 from pathlib import Path
-from upath import UPath
 
 from .types import KEYED
+from .instrumentation import Instrumentation
+from .rate_limiter import RateLimiter
+from .dedupe_store import DedupeStore, SqliteDedupeBackend, SSMDedupeBackend
 from .ssm_parameter_store import SSMParameterStore
 
 
-load_dotenv("../../.env")
-
-
 class Constants:
     DEFAULTS = {
         "APP_NAME": "packager",
@@ -29,6 +28,50 @@ class Constants:
         "INPUT_METADATA": "input_metadata.json",
         "QUILT_SUMMARIZE": "quilt_summarize.json",
     }
+    CHUNK_SIZE = 1024 * 1024
+    # resolved contexts, reused across warm Lambda invocations
+    _resolved: dict[str, KEYED] = {}
+    MAX_RESOLVED = 32
+    DEFAULT_TIMEOUT = 900
+    DEDUPE_PATH = "/tmp/packager-dedupe.sqlite"
+    _dedupe: dict[str, DedupeStore] = {}
+    _dotenv_loaded = False
+    # handleBatch workers share one Constants and these caches
+    _lock = threading.RLock()
+
+    @classmethod
+    def ClearCache(cls) -> None:
+        with cls._lock:
+            cls._resolved.clear()
+            cls._dedupe.clear()
+        SSMParameterStore.ClearCache()
+        RateLimiter.ClearCache()
+
+    @classmethod
+    def LoadDotenv(cls) -> None:
+        """Read ../../.env once, on first use rather than at import"""
+        if not cls._dotenv_loaded:
+            from dotenv import load_dotenv
+
+            load_dotenv("../../.env")
+            cls._dotenv_loaded = True
+
+    @classmethod
+    def Resolve(cls, context: Any) -> KEYED:
+        cls.LoadDotenv()
+        items = context.items() if isinstance(context, dict) else []
+        key = json.dumps([sorted(items), sorted(os.environ.items())], default=str)
+        with cls._lock:
+            if key not in cls._resolved:
+                if len(cls._resolved) >= cls.MAX_RESOLVED:
+                    cls._resolved.clear()
+                resolved: KEYED = {}
+                for source in [items, Constants.DEFAULTS.items(), os.environ.items()]:
+                    for env, value in source:
+                        if resolved.get(env) is None:
+                            resolved[env] = value
+                cls._resolved[key] = resolved
+            return cls._resolved[key]
 
     @classmethod
     def GET(cls, key: str) -> Any:
@@ -50,14 +93,18 @@ class Constants:
         try:
             parsed = cls.LoadObjectPath(file_path)
             return cls.KeyPathFromObject(parsed, key_path)
-        except Exception as e:
-            print(e)
+        except Exception:
+            Instrumentation.Logger().exception(
+                "KeyPathFromPath", extra={"path": str(file_path), "key_path": key_path}
+            )
             return None
 
     @staticmethod
     def LoadObjectData(data: str, extension: str, env: KEYED = {}) -> KEYED:
         parsed = None
         if extension in ["yaml", "yml"]:
+            import yaml
+
             parsed = yaml.safe_load(data)
         elif extension == "json":
             parsed = json.loads(data)
@@ -80,20 +127,32 @@ class Constants:
     @classmethod
     def ToPath(cls, uri: str) -> Path:
         if uri.startswith("s3://"):
+            from upath import UPath
+
             return UPath(uri)
         return Path(uri).absolute().resolve()
 
     @classmethod
     def DownloadURI(cls, uri: str) -> Generator[Path, None, None]:
+        """Stream into a temporary directory and yield the local path"""
+        from upath import UPath
+
         file_path = cls.ToPath(uri)
-        print(f"DownloadURI: {file_path} exists: {file_path.exists()}")
-        data = file_path.read_text()
-        print(f"DownloadURI.data: {len(data)}")
-        """Save into a temporary directory and return the path"""
-        with TemporaryDirectory() as tmp:
-            file_path = Path(tmp) / file_path.name
-            file_path.write_text(data)
+        Instrumentation.Logger().debug("DownloadURI", extra={"uri": str(file_path)})
+        if not isinstance(file_path, UPath):
+            # already on local disk; hand it straight to the parser
             yield file_path
+            return
+        with TemporaryDirectory() as tmp:
+            local_path = Path(tmp) / file_path.name
+            with file_path.open("rb") as src, local_path.open("wb") as dest:
+                shutil.copyfileobj(src, dest, cls.CHUNK_SIZE)
+            size = local_path.stat().st_size
+            Instrumentation.Logger().debug(
+                "DownloadURI.bytes", extra={"uri": str(file_path), "bytes": size}
+            )
+            Instrumentation.Current().count("download_bytes", size, "Bytes")
+            yield local_path
 
     @classmethod
     def GetRegion(cls) -> str:
@@ -103,15 +162,12 @@ class Constants:
         return str(cc.region)
 
     def __init__(self, context: KEYED = {}) -> None:
-        self.context: KEYED = {}
-        if isinstance(context, dict):
-            self.update_context(context.items())
-        self.update_context(Constants.DEFAULTS.items())
-        self.update_context(os.environ.items())
+        self.context: KEYED = dict(self.Resolve(context))
         self.app = self.get("APP_NAME")
         self.account = self.get("CDK_DEFAULT_ACCOUNT", "AWS_ACCOUNT_ID")
         self.region = self.get("CDK_DEFAULT_REGION", "AWS_DEFAULT_REGION")
-        self.ssm = SSMParameterStore(self.app, self.region)
+        RateLimiter.Setup(self.context)
+        self.ssm = SSMParameterStore.Shared(self.app, self.region)
 
     def to_dict(self) -> KEYED:
         return {
@@ -134,6 +190,12 @@ class Constants:
             return value
         return self.context.get(key2)
 
+    def flag(self, key: str, default: str = "") -> bool:
+        """A boolean setting: 1, true or yes in any case; unset is `default`"""
+        value = self.get(key)
+        value = default if value in (None, "") else value
+        return str(value).lower() in ["1", "true", "yes"]
+
     def has(self, key: str) -> bool:
         return self.get(key) is not None
 
@@ -157,18 +219,30 @@ class Constants:
         return f"{self.account}.dkr.ecr.{self.region}.amazonaws.com"
 
     def timeout(self) -> int:
-        return int(self.get("TIMEOUT"))
+        return int(self.get("TIMEOUT") or self.DEFAULT_TIMEOUT)
+
+    def dedupe_store(self) -> DedupeStore:
+        backend = self.get("DEDUPE_BACKEND") or "ssm"
+        timeout = self.timeout()
+        key = f"{backend}:{self.app}:{self.region}:{timeout}"
+        with Constants._lock:
+            if key not in Constants._dedupe:
+                if backend == "ssm":
+                    store = DedupeStore(SSMDedupeBackend(self.ssm), timeout)
+                elif backend == "sqlite":
+                    path = self.get("DEDUPE_PATH") or self.DEDUPE_PATH
+                    store = DedupeStore(SqliteDedupeBackend(path), timeout)
+                else:
+                    raise ValueError(f"Unsupported DEDUPE_BACKEND: {backend}")
+                Constants._dedupe[key] = store
+            return Constants._dedupe[key]
 
-    def check_time(self, uri: str) -> bool:
+    @staticmethod
+    def DedupeKey(uri: str) -> str:
         # remove prefix from uri
-        key = uri.replace("s3://", "")
+        return uri.replace("s3://", "")
+
+    def check_time(self, uri: str) -> bool:
+        key = self.DedupeKey(uri)
         now = round(datetime.now().timestamp())
-        if key in self.ssm:
-            prior = int(self.ssm[key])
-            delta = now - prior
-            timeout = self.timeout()
-            if delta < timeout:
-                print(f"Too soon: {delta} < {timeout}")
-                return False
-        self.ssm[key] = str(now)
-        return True
+        return self.dedupe_store().check(key, now)
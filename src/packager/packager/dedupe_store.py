@@ -0,0 +1,145 @@
+import sqlite3
+import threading
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional, Protocol
+
+from .instrumentation import Instrumentation
+from .ssm_parameter_store import SSMParameterStore
+
+
+class DedupeBackend(Protocol):
+    def get(self, key: str) -> Optional[int]: ...
+
+    def get_many(self, keys: list[str]) -> dict[str, int]: ...
+
+    def put_many(self, items: dict[str, int]) -> None: ...
+
+
+class SSMDedupeBackend:
+    """One String parameter per key, read with a direct get_parameter"""
+
+    def __init__(self, store: SSMParameterStore) -> None:
+        self.store = store
+
+    def get(self, key: str) -> Optional[int]:
+        value = self.store.fetch(key)
+        return None if value is None else int(value)
+
+    def get_many(self, keys: list[str]) -> dict[str, int]:
+        return {key: int(value) for key, value in self.store.fetch_many(keys).items()}
+
+    def put_many(self, items: dict[str, int]) -> None:
+        for key, timestamp in items.items():
+            self.store.put(key, str(timestamp))
+
+
+class SqliteDedupeBackend:
+    """Local stand-in for tests and single-host runs"""
+
+    def __init__(self, path: str = ":memory:") -> None:
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, ts INTEGER)"
+        )
+
+    def get(self, key: str) -> Optional[int]:
+        row = self.db.execute("SELECT ts FROM seen WHERE key = ?", (key,)).fetchone()
+        return None if row is None else int(row[0])
+
+    def get_many(self, keys: list[str]) -> dict[str, int]:
+        marks = ",".join("?" * len(keys))
+        rows = self.db.execute(
+            f"SELECT key, ts FROM seen WHERE key IN ({marks})", keys
+        ).fetchall()
+        return {key: int(ts) for key, ts in rows}
+
+    def put_many(self, items: dict[str, int]) -> None:
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO seen (key, ts) VALUES (?, ?)", items.items()
+            )
+
+
+class DedupeStore:
+    """
+    Remembers when each key was last seen, in front of a persistent backend.
+
+    Lookups hit a bounded LRU first, but only entries still within `ttl`
+    are trusted: an expired one is re-read, since another container may
+    have marked the key since. `prefetch()` reads many keys in one backend
+    call, remembering misses only while it is open. Writes go straight
+    through, so other containers see each mark at once.
+    """
+
+    def __init__(self, backend: DedupeBackend, ttl: int, maxsize: int = 1024) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._cache: OrderedDict[str, int] = OrderedDict()
+        self._absent: set[str] = set()
+        self._lock = threading.RLock()
+
+    def check(self, key: str, now: int) -> bool:
+        """Mark `key` as seen at `now`, unless it was seen within `ttl`"""
+        with self._lock:
+            prior = self.last_seen(key, now)
+            if prior is not None and now - prior < self.ttl:
+                Instrumentation.Logger().info(
+                    "DedupeStore.check: too soon",
+                    extra={"key": key, "age": now - prior, "ttl": self.ttl},
+                )
+                return False
+            self.mark(key, now)
+            return True
+
+    def last_seen(self, key: str, now: int) -> Optional[int]:
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and now - cached < self.ttl:
+                self._cache.move_to_end(key)
+                return cached
+            self._cache.pop(key, None)
+            if key in self._absent:
+                return None
+            prior = self.backend.get(key)
+            if prior is not None:
+                self._remember(key, prior)
+            return prior
+
+    def mark(self, key: str, now: int) -> None:
+        with self._lock:
+            self._remember(key, now)
+            self._absent.discard(key)
+            self.backend.put_many({key: now})
+
+    @contextmanager
+    def prefetch(self, keys: Iterable[str]) -> Iterator["DedupeStore"]:
+        with self._lock:
+            missing = [key for key in dict.fromkeys(keys) if key not in self._cache]
+        absent: set[str] = set()
+        try:
+            found = self.backend.get_many(missing) if missing else {}
+        except Exception as e:
+            Instrumentation.Logger().warning(
+                "DedupeStore.prefetch: reading one at a time", extra={"error": str(e)}
+            )
+            found = {}
+        else:
+            absent = set(missing) - set(found)
+        with self._lock:
+            for key, timestamp in found.items():
+                self._remember(key, timestamp)
+            self._absent |= absent
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._absent -= absent
+
+    def _remember(self, key: str, timestamp: int) -> None:
+        self._cache[key] = timestamp
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
@@ -0,0 +1,281 @@
+import gzip
+import io
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any, Generator, Optional, TYPE_CHECKING
+
+from .constants import Constants
+from .instrumentation import Instrumentation
+from .types import KEYED
+
+if TYPE_CHECKING:
+    from pandas import DataFrame  # type: ignore
+    from .gsa_handler import GSAHandler
+
+DEFAULT_FASTQ_READS = 1_000_000
+DEFAULT_VEP_VARIANTS = 1_000_000
+
+
+class Extractor(ABC):
+    """
+    Derives tables from the run outputs whose keys match `PATTERNS`.
+
+    Patterns are `fnmatch` globs over keys relative to the run root, so `*`
+    also spans directories. `extract` returns the files it wrote (`tables`),
+    optional quilt_summarize `entries`, and `meta` for the package.
+    """
+
+    NAME = ""
+    PATTERNS: tuple[str, ...] = ()
+
+    @staticmethod
+    @contextmanager
+    def OpenText(uri: str) -> Generator[io.TextIOBase, None, None]:
+        """Stream a (possibly gzipped) text object without a local copy"""
+        file_path = Constants.ToPath(uri)
+        with file_path.open("rb") as raw:
+            stream = gzip.open(raw) if file_path.name.endswith(".gz") else raw
+            with io.TextIOWrapper(stream, encoding="utf-8") as text:
+                yield text
+
+    def match(self, keys: list[str]) -> list[str]:
+        matched = [
+            key for pattern in self.PATTERNS for key in keys if fnmatch(key, pattern)
+        ]
+        return list(dict.fromkeys(matched))
+
+    @abstractmethod
+    def extract(self, handler: "GSAHandler", root: Path, keys: list[str]) -> KEYED:
+        pass
+
+    def writeTable(
+        self, handler: "GSAHandler", table: "DataFrame", folder: Path, name: str
+    ) -> KEYED:
+        tables = {}
+        for fmt in handler.tableFormats():
+            dest = folder / f"{name}.{fmt}"
+            Instrumentation.Logger().debug(
+                f"{type(self).__name__}.writeTable", extra={"dest": str(dest)}
+            )
+            handler.WriteTable(table, dest)
+            tables[dest.name] = str(dest)
+        return tables
+
+
+class BqsrExtractor(Extractor):
+    NAME = "recal"
+    PATTERNS = ("*bqsr_report/*.recal_data.csv",)
+
+    def extract(self, handler: "GSAHandler", root: Path, keys: list[str]) -> KEYED:
+        from .recal_summary import SUMMARY_JSON, RecalSummary
+
+        if len(keys) > 1:
+            Instrumentation.Logger().info(
+                "BqsrExtractor.skipped", extra={"keys": keys[1:]}
+            )
+        report_uri = f"{root}/{keys[0]}"
+        summary = RecalSummary()
+        assets = handler.summaryAssets()
+        collectors = [summary] if assets is None else [summary, assets]
+        tables = handler.downloadReport(report_uri, root, collectors)
+        if not tables:
+            return {}
+        out = handler.ReportRoot(report_uri)
+        tables.update(summary.write(out, handler.tableFormats(), handler.WriteTable))
+        result = {"tables": tables, "meta": summary.headline(), "summary": summary}
+        if assets is not None:
+            entries = assets.write(out, summary)
+            entries[SUMMARY_JSON] = tables[SUMMARY_JSON]
+            result["entries"] = entries
+        return result
+
+
+class VepExtractor(Extractor):
+    NAME = "vep"
+    PATTERNS = ("*.ann.tab", "*.ann.tab.gz", "*.ann.vcf", "*.ann.vcf.gz")
+
+    @staticmethod
+    def Sample(key: str) -> str:
+        return key.rsplit(".ann.", 1)[0]
+
+    @staticmethod
+    def Counts() -> KEYED:
+        return {"variants": 0, "Consequence": {}, "IMPACT": {}, "sampled": False}
+
+    @staticmethod
+    def CountTab(text: io.TextIOBase, max_variants: int = 0) -> KEYED:
+        """Consequences and impacts from VEP's default tab output"""
+        counts = VepExtractor.Counts()
+        columns: list[str] = []
+        last = None
+        for line in text:
+            if line.startswith("##"):
+                continue
+            fields = line.rstrip("\n").split("\t")
+            if line.startswith("#"):
+                columns = [fields[0].lstrip("#"), *fields[1:]]
+                continue
+            row = dict(zip(columns, fields))
+            if row.get("Uploaded_variation") != last:
+                if max_variants and counts["variants"] >= max_variants:
+                    counts["sampled"] = True
+                    break
+                last = row.get("Uploaded_variation")
+                counts["variants"] += 1
+            extra = dict(
+                item.split("=", 1)
+                for item in row.get("Extra", "").split(";")
+                if "=" in item
+            )
+            VepExtractor.Tally(counts, row.get("Consequence"), extra.get("IMPACT"))
+        return counts
+
+    @staticmethod
+    def CountVcf(text: io.TextIOBase, max_variants: int = 0) -> KEYED:
+        """Consequences and impacts from the CSQ field of VEP's VCF output"""
+        counts = VepExtractor.Counts()
+        fields: list[str] = []
+        for line in text:
+            if line.startswith("##INFO=<ID=CSQ"):
+                fields = line.split("Format: ", 1)[1].split('"')[0].split("|")
+                continue
+            if line.startswith("#"):
+                continue
+            if max_variants and counts["variants"] >= max_variants:
+                counts["sampled"] = True
+                break
+            counts["variants"] += 1
+            info = line.rstrip("\n").split("\t")[7]
+            for item in info.split(";"):
+                if not item.startswith("CSQ="):
+                    continue
+                for annotation in item[4:].split(","):
+                    row = dict(zip(fields, annotation.split("|")))
+                    VepExtractor.Tally(
+                        counts, row.get("Consequence"), row.get("IMPACT")
+                    )
+        return counts
+
+    @staticmethod
+    def Tally(counts: KEYED, consequence: Optional[str], impact: Optional[str]) -> None:
+        for term in (consequence or "").replace("&", ",").split(","):
+            if term and term != "-":
+                counts["Consequence"][term] = counts["Consequence"].get(term, 0) + 1
+        if impact:
+            counts["IMPACT"][impact] = counts["IMPACT"].get(impact, 0) + 1
+
+    def extract(self, handler: "GSAHandler", root: Path, keys: list[str]) -> KEYED:
+        from pandas import DataFrame
+
+        max_variants = int(handler.cc.get("VEP_MAX_VARIANTS") or DEFAULT_VEP_VARIANTS)
+        samples: dict[str, str] = {}
+        for key in keys:  # already in PATTERNS order, so tab wins over vcf
+            samples.setdefault(self.Sample(key), key)
+        tables: KEYED = {}
+        meta: KEYED = {}
+        for sample, key in samples.items():
+            count = self.CountVcf if ".ann.vcf" in key else self.CountTab
+            with self.OpenText(f"{root}/{key}") as text:
+                counts = count(text, max_variants)
+            rows = [
+                {"Category": category, "Value": value, "Count": n}
+                for category in ["Consequence", "IMPACT"]
+                for value, n in sorted(counts[category].items())
+            ]
+            table = DataFrame(rows, columns=["Category", "Value", "Count"])
+            folder = (root / sample).parent
+            name = f"{Path(sample).name}.vep_summary"
+            tables.update(self.writeTable(handler, table, folder, name))
+            meta[Path(sample).name] = {
+                "variants": counts["variants"],
+                "impact": counts["IMPACT"],
+                "sampled": counts["sampled"],
+            }
+        return {"tables": tables, "meta": meta}
+
+
+class FastqExtractor(Extractor):
+    NAME = "fastq"
+    PATTERNS = ("*.fastq.gz", "*.fq.gz", "*.fastq", "*.fq")
+    STATS_TABLE = "fastq_stats"
+
+    @staticmethod
+    def Stats(text: io.TextIOBase, max_reads: int) -> KEYED:
+        """Read, base, GC and quality totals over the first `max_reads`"""
+        reads = bases = gc = quality = 0
+        shortest: Optional[int] = None
+        longest = 0
+        sampled = False
+        while True:
+            header = text.readline()
+            if not header:
+                break
+            if max_reads and reads >= max_reads:
+                sampled = True
+                break
+            sequence = text.readline().rstrip("\n")
+            text.readline()
+            scores = text.readline().rstrip("\n")
+            length = len(sequence)
+            reads += 1
+            bases += length
+            gc += sequence.count("G") + sequence.count("C")
+            quality += sum(scores.encode()) - 33 * len(scores)
+            longest = max(longest, length)
+            shortest = length if shortest is None else min(shortest, length)
+        return {
+            "reads": reads,
+            "bases": bases,
+            "min_length": shortest or 0,
+            "max_length": longest,
+            "mean_length": bases / reads if reads else 0.0,
+            "gc_fraction": gc / bases if bases else 0.0,
+            "mean_quality": quality / bases if bases else 0.0,
+            "sampled": sampled,
+        }
+
+    def extract(self, handler: "GSAHandler", root: Path, keys: list[str]) -> KEYED:
+        from pandas import DataFrame
+
+        max_reads = int(handler.cc.get("FASTQ_MAX_READS") or DEFAULT_FASTQ_READS)
+        rows: list[KEYED] = []
+        for key in keys:
+            with self.OpenText(f"{root}/{key}") as text:
+                rows.append({"file": key, **self.Stats(text, max_reads)})
+        table = DataFrame(rows)
+        tables = self.writeTable(handler, table, root, self.STATS_TABLE)
+        meta = {
+            row["file"]: {k: v for k, v in row.items() if k != "file"} for row in rows
+        }
+        return {"tables": tables, "meta": meta}
+
+
+class ExtractorRegistry:
+    """
+    Chooses extractors for a run from a single listing of its outputs.
+
+    Register custom `Extractor` instances with `register`; `select` pairs
+    each one with the keys it matched, skipping extractors with no match.
+    """
+
+    @classmethod
+    def Default(cls) -> "ExtractorRegistry":
+        return cls([BqsrExtractor(), VepExtractor(), FastqExtractor()])
+
+    def __init__(self, extractors: Optional[list[Any]] = None) -> None:
+        self.extractors: list[Extractor] = list(extractors or [])
+
+    def register(self, extractor: Extractor) -> Extractor:
+        self.extractors.append(extractor)
+        return extractor
+
+    def select(self, keys: list[str]) -> list[tuple[Extractor, list[str]]]:
+        selected = []
+        for extractor in self.extractors:
+            matched = extractor.match(keys)
+            if matched:
+                selected.append((extractor, matched))
+        return selected
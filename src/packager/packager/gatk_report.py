@@ -0,0 +1,119 @@
+import re
+import warnings
+
+from io import StringIO
+from pandas import DataFrame, read_fwf  # type: ignore
+from pathlib import Path
+from typing import IO, Iterator, NamedTuple, Optional
+
+
+class TableFormat(NamedTuple):
+    n_cols: int
+    n_rows: int
+    col_formats: list[str]
+
+
+class TableId(NamedTuple):
+    name: str
+    description: str
+
+
+class GatkReportStream:
+    """
+    Reads a `#:GATKReport.v1.x` file one table at a time.
+
+    Iterating yields `(name, DataFrame)` pairs as each table is completed,
+    so only the current table is ever held in memory.
+    """
+
+    # bump when parsing changes, to invalidate cached tables
+    VERSION = "1"
+
+    REPORT_RX = re.compile(
+        r"^#:GATKReport\.v(?P<version>[0-9.]+):(?P<n_tables>\d+)", re.I
+    )
+    FORMAT_RX = re.compile(
+        r"^#:GATKTable:(?P<n_cols>\d+):(?P<n_rows>\d+):(?P<col_formats>\S+):;", re.I
+    )
+    ID_RX = re.compile(r"^#:GATKTable:(?P<name>[^:]*):(?P<description>[^:]*)", re.I)
+
+    @classmethod
+    def ParseFormat(cls, line: str) -> Optional[TableFormat]:
+        m = cls.FORMAT_RX.match(line)
+        if m is None:
+            return None
+        return TableFormat(
+            int(m.group("n_cols")) - 1,
+            int(m.group("n_rows")),
+            m.group("col_formats").split(":"),
+        )
+
+    @classmethod
+    def ParseId(cls, line: str) -> Optional[TableId]:
+        m = cls.ID_RX.match(line)
+        if m is None:
+            return None
+        return TableId(m.group("name"), m.group("description"))
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.version = ""
+        self.n_tables = 0
+
+    def __iter__(self) -> Iterator[tuple[str, DataFrame]]:
+        with self.path.open("r") as fh:
+            yield from self.read(fh)
+
+    def read(self, fh: IO[str]) -> Iterator[tuple[str, DataFrame]]:
+        header = fh.readline()
+        m = self.REPORT_RX.match(header)
+        if m is None or not m.group("version").startswith("1"):
+            raise ValueError(f"Unsupported GATKReport header: {header.strip()}")
+        self.version = m.group("version")
+        self.n_tables = int(m.group("n_tables"))
+
+        count = 0
+        table_format: Optional[TableFormat] = None
+        table_id: Optional[TableId] = None
+        table_data = StringIO()
+        n_lines = 0
+        for raw in fh:
+            line = raw.rstrip()
+            lower = line.lower()
+            if lower.startswith("#:gatktable"):
+                if n_lines:
+                    yield self.build(table_format, table_id, table_data, n_lines)
+                    table_format, table_id = None, None
+                    table_data, n_lines = StringIO(), 0
+                if table_format is None:
+                    table_format = self.ParseFormat(line)
+                else:
+                    table_id = self.ParseId(line)
+                    count += 1
+            elif line.strip() == "" or line.strip().startswith("#"):
+                continue
+            elif table_format is not None and table_id is not None:
+                table_data.write(line + "\n")
+                n_lines += 1
+        if n_lines:
+            yield self.build(table_format, table_id, table_data, n_lines)
+        if count != self.n_tables:
+            warnings.warn(f"Expected {self.n_tables} tables, but found {count}")
+
+    @staticmethod
+    def build(
+        table_format: Optional[TableFormat],
+        table_id: Optional[TableId],
+        table_data: StringIO,
+        n_lines: int,
+    ) -> tuple[str, DataFrame]:
+        assert table_format is not None and table_id is not None
+        n_rows = n_lines - 1  # first line is the column header
+        if n_rows != table_format.n_rows:
+            warnings.warn(
+                f"Table {table_id.name} should have {table_format.n_rows} rows, "
+                f"but actually has {n_rows}"
+            )
+        table_data.seek(0)
+        frame = read_fwf(table_data)
+        return table_id.name, frame
@@ -1,24 +1,49 @@
+import asyncio
 import json
+import threading
 
-from gsalib import GatkReport  # type: ignore
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from quilt3 import Package  # type: ignore
-from typing import Any, TYPE_CHECKING
+from tempfile import TemporaryDirectory
+from typing import Any, Callable, Iterable, Optional, Sequence, TYPE_CHECKING
 
 from .types import KEYED
 
 from .constants import Constants
+from .extractors import Extractor, ExtractorRegistry
+from .instrumentation import Instrumentation
+from .rate_limiter import RateLimiter
 
+# pandas, quilt3 and s3fs are imported by the stages that use them, so
+# events rejected by the debounce check never pay for loading them
 if TYPE_CHECKING:
     from aws_lambda_powertools.utilities.typing import LambdaContext
+    from pandas import DataFrame  # type: ignore
+    from quilt3 import Package  # type: ignore
+    from .package_checkpoint import PackageCheckpoint
+    from .package_meta import PackageMeta
+    from .package_shards import PackageShards
+    from .recal_index import RecalIndex
+    from .report_cache import ReportCache
+    from .run_manifest import RunManifest
+    from .summary_assets import SummaryAssets
 else:
     LambdaContext = object
 
 LOG_STREAM = "OmicsQuiltDemo-{:0>4d}{:0>2d}{:0>2d}"
-REPORT_SUFFIX = "out/bqsr_report/NA12989.hg38.recal_data.csv"
+TABLE_FORMATS = ["csv", "parquet"]
+DEFAULT_TABLE_FORMAT = "csv"
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_PREVIEW_ROWS = 100
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+CHECKPOINT_PREFIX = ".packager/checkpoints"
 
 
 class GSAHandler:
+    # quilt3's transfer settings are process-wide, so they are set once
+    _transfer: Optional[KEYED] = None
+    _transfer_lock = threading.Lock()
+
     @staticmethod
     def ReportRoot(report_uri: str) -> Path:
         report_path = Constants.ToPath(report_uri)
@@ -41,19 +66,119 @@ class GSAHandler:
                 return dict(context.client_context.env)
         return {}
 
+    @staticmethod
+    def ParseRecords(batch: Any) -> tuple[list[tuple[str, KEYED]], dict[str, str]]:
+        """
+        Unwrap an SQS batch, a list of events, or a single event.
+
+        Also returns the SQS records whose body is not a JSON object, keyed
+        by message id, so one bad message cannot fail the whole batch.
+        """
+        if isinstance(batch, dict) and "Records" in batch:
+            records = []
+            malformed = {}
+            for record in batch["Records"]:
+                try:
+                    event = json.loads(record["body"])
+                except (TypeError, ValueError) as e:
+                    malformed[record["messageId"]] = f"Malformed body: {e}"
+                    continue
+                if not isinstance(event, dict):
+                    malformed[record["messageId"]] = "Malformed body: not an object"
+                    continue
+                records.append((record["messageId"], event))
+            return records, malformed
+        if isinstance(batch, dict):
+            batch = [batch]
+        return [(event.get("id", str(i)), event) for i, event in enumerate(batch)], {}
+
+    @staticmethod
+    def RunOutputUri(event: KEYED) -> str:
+        return str(event.get("detail", {}).get("runOutputUri", ""))
+
+    @staticmethod
+    def InPlaceSelector(bucket: str, package: str) -> Callable[[str, Any], bool]:
+        """Only copy entries not already stored under the package prefix"""
+        prefix = f"{package}/"
+
+        def selector(logical_key: str, entry: Any) -> bool:
+            physical_key = entry.physical_key
+            in_place = physical_key.bucket == bucket and str(
+                physical_key.path
+            ).startswith(prefix)
+            return not in_place
+
+        return selector
+
+    @staticmethod
+    def RelativeEntry(entry: Any, root: Path) -> Any:
+        """quilt_summarize paths resolve against the package root"""
+        prefix = str(root).rstrip("/") + "/"
+        if isinstance(entry, dict):
+            return {**entry, "path": GSAHandler.RelativeEntry(entry["path"], root)}
+        return entry[len(prefix) :] if entry.startswith(prefix) else entry
+
+    @staticmethod
+    def TableFormats(setting: str) -> list[str]:
+        formats = [fmt.strip().lower() for fmt in setting.split(",") if fmt.strip()]
+        for fmt in formats:
+            if fmt not in TABLE_FORMATS:
+                raise ValueError(f"Unsupported TABLE_FORMAT: {fmt}")
+        return formats
+
+    @staticmethod
+    def WriteTable(table: "DataFrame", dest: Path) -> None:
+        # pandas opens remote UPaths through fsspec only when given the URI
+        target = str(dest)
+        if dest.suffix == ".parquet":
+            table.to_parquet(target, compression="zstd", index=False)
+        else:
+            table.to_csv(target)
+
     def __init__(self, context: Any):
+        self.lambda_context = context
         self.context = self.GetContext(context)
         self.cc = Constants(self.context)
+        self.extractors = ExtractorRegistry.Default()
+
+    @property
+    def logger(self) -> Any:
+        return Instrumentation.Logger()
+
+    def remainingTime(self) -> Optional[float]:
+        """Seconds left in this Lambda invocation, if running in one"""
+        remaining = getattr(self.lambda_context, "get_remaining_time_in_millis", None)
+        millis = remaining() if callable(remaining) else None
+        return millis / 1000 if millis else None
 
     def handleEvent(self, event: KEYED) -> KEYED:
+        with Instrumentation.Run(self.instrumentationMode()) as run:
+            try:
+                return asyncio.run(self.handleEventAsync(event))
+            finally:
+                run.flush(run_uri=self.RunOutputUri(event))
+
+    def instrumentationMode(self) -> str:
+        return str(self.cc.get("INSTRUMENTATION") or "log")
+
+    async def handleEventAsync(self, event: KEYED) -> KEYED:
         opts = self.parseEvent(event)
         body = {
             "message": "N/A",
             "event": event,
             "opts": opts,
         }
-        print(f"handleEvent.opts: {opts}")
-        ready = opts["debug"] or self.cc.check_time(opts["uri"])
+        self.logger.info(
+            "handleEvent",
+            extra={
+                "package": opts["package"],
+                "uri": opts["uri"],
+                "type": opts["type"],
+                "debug": opts["debug"],
+            },
+        )
+        with Instrumentation.Current().stage("debounce"):
+            ready = opts["debug"] or self.cc.check_time(opts["uri"])
         if not ready:
             body["message"] = "Not ready"
             return {
@@ -73,19 +198,190 @@ class GSAHandler:
                 "body": body,
             }
 
+        # raises while another attempt holds the lease, so the event is retried
+        checkpoint = None if opts.get("debug") else self.claimCheckpoint(opts)
+
         root = Constants.ToPath(opts["uri"])
-        report_uri = f"{root}/{REPORT_SUFFIX}"
-        print(f"handleEvent.root: {root}")
+        self.logger.debug("handleEvent.root", extra={"root": str(root)})
         if not opts.get("debug"):
-            tables = self.downloadReport(report_uri, root)
-            self.summarizeTables(tables, root)
-            body["opts"] = self.packageFolder(root, opts)
-            body["message"] = f"{report_uri} @ {root}"
+            try:
+                body["opts"] = await self.runPipeline(root, opts, checkpoint)
+            except Exception:
+                if checkpoint is not None:
+                    checkpoint.release()
+                raise
+            body["message"] = f"{root}"
         return {
             "statusCode": 201,
             "body": body,
         }
 
+    async def runPipeline(
+        self,
+        root: Path,
+        opts: KEYED,
+        checkpoint: Optional["PackageCheckpoint"] = None,
+    ) -> KEYED:
+        """Run matching extractors concurrently with metadata reads"""
+        registry = f"s3://{self.ParseURI(opts['uri'])['bucket']}"
+        run = Instrumentation.Current()
+        self.configureTransfer()  # before browsePrior builds its clients
+        with run.stage("list"):
+            manifest = await asyncio.to_thread(self.runManifest(root).load)
+        run.count("objects", len(manifest.objects))
+        run.count("list_requests", manifest.requests)
+        selected = self.extractors.select(manifest.keys())
+        self.logger.info(
+            "runPipeline.extractors",
+            extra={"extractors": [e.NAME for e, _ in selected]},
+        )
+        results, meta, prior = await asyncio.gather(
+            asyncio.gather(
+                *[
+                    asyncio.to_thread(self.runExtractor, extractor, root, matched)
+                    for extractor, matched in selected
+                ]
+            ),
+            asyncio.to_thread(self.readMeta, root, opts),
+            asyncio.to_thread(self.browsePrior, opts["package"], registry),
+        )
+        tables: KEYED = {}
+        entries: KEYED = {}
+        summary = None
+        for (extractor, _), result in zip(selected, results):
+            if not result:
+                continue
+            tables.update(result["tables"])
+            entries.update(result.get("entries") or result["tables"])
+            meta[extractor.NAME] = result["meta"]
+            summary = result.get("summary", summary)
+        with run.stage("summarize"):
+            summarize = await asyncio.to_thread(
+                self.summarizeTables, tables, root, entries
+            )
+        # record what the extractors wrote, so it is packaged too
+        written = {str(summarize), *map(str, tables.values())}
+        written.update(
+            entry["path"] if isinstance(entry, dict) else entry
+            for entry in entries.values()
+        )
+        with run.stage("manifest"):
+            for uri in sorted(written):
+                await asyncio.to_thread(manifest.add, uri)
+        pushed: KEYED = await asyncio.to_thread(
+            self.pushFolder, root, opts, meta, prior, manifest, checkpoint
+        )
+        index = self.recalIndex()
+        if index is not None and summary is not None:
+            try:
+                with run.stage("index"):
+                    pushed["index"] = await asyncio.to_thread(
+                        index.append, opts, pushed, summary
+                    )
+            except Exception:
+                self.logger.exception("runPipeline.index.error")
+        return pushed
+
+    def handleShard(self, event: KEYED) -> KEYED:
+        """Worker side of sharded hashing: one partial manifest"""
+        from .package_shards import PackageShards
+
+        pieces = event["shard"]
+        self.logger.info("handleShard", extra={"pieces": len(pieces)})
+        return {"pieces": PackageShards.HashShard(pieces)}
+
+    def claimCheckpoint(self, opts: KEYED) -> Optional["PackageCheckpoint"]:
+        """Lease this run's checkpoint, raising `CheckpointHeld` if taken"""
+        checkpoint = self.checkpoint(opts)
+        if checkpoint is not None:
+            with Instrumentation.Current().stage("lease"):
+                attempt = checkpoint.acquire()
+            self.logger.info(
+                "handleEvent.lease",
+                extra={
+                    "checkpoint": checkpoint.uri,
+                    "attempt": attempt,
+                    "lease": checkpoint.lease,
+                },
+            )
+        return checkpoint
+
+    def runExtractor(self, extractor: Extractor, root: Path, keys: list[str]) -> KEYED:
+        with Instrumentation.Current().stage(f"extract.{extractor.NAME}"):
+            return extractor.extract(self, root, keys)
+
+    def browsePrior(self, name: str, registry: str) -> Optional["Package"]:
+        from .package_delta import PackageDelta
+
+        with Instrumentation.Current().stage("browse"):
+            return PackageDelta.Browse(name, registry)
+
+    def recalIndex(self) -> Optional["RecalIndex"]:
+        from .recal_index import RecalIndex
+
+        uri = self.cc.get("RECAL_INDEX")
+        return RecalIndex(uri) if uri else None
+
+    def maxWorkers(self) -> int:
+        return int(self.cc.get("MAX_WORKERS") or DEFAULT_MAX_WORKERS)
+
+    def handleBatch(self, batch: Any) -> KEYED:
+        records, malformed = self.ParseRecords(batch)
+        unique: dict[str, tuple[str, KEYED]] = {}
+        duplicates: list[str] = []
+        for record_id, event in records:
+            uri = self.RunOutputUri(event) or record_id
+            if uri in unique:
+                duplicates.append(record_id)
+            else:
+                unique[uri] = (record_id, event)
+        self.logger.info(
+            "handleBatch",
+            extra={
+                "runs": len(unique),
+                "duplicates": len(duplicates),
+                "malformed": len(malformed),
+            },
+        )
+
+        results: KEYED = {}
+        failures: list[KEYED] = []
+        for record_id, error in malformed.items():
+            self.logger.warning(
+                "handleBatch.malformed", extra={"record_id": record_id, "error": error}
+            )
+            results[record_id] = {"statusCode": 400, "body": error}
+            failures.append({"itemIdentifier": record_id})
+        # read every debounce mark up front; each worker still writes its
+        # own mark as soon as its event is accepted, so other containers
+        # see it while this batch is still packaging
+        keys = [
+            Constants.DedupeKey(self.RunOutputUri(event))
+            for _, event in unique.values()
+            if self.RunOutputUri(event)
+        ]
+        with self.cc.dedupe_store().prefetch(keys), ThreadPoolExecutor(
+            max_workers=self.maxWorkers()
+        ) as pool:
+            futures = {
+                record_id: pool.submit(self.handleEvent, event)
+                for record_id, event in unique.values()
+            }
+            for record_id, future in futures.items():
+                try:
+                    results[record_id] = future.result()
+                except Exception as e:
+                    self.logger.exception(
+                        "handleBatch.error", extra={"record_id": record_id}
+                    )
+                    results[record_id] = {"statusCode": 500, "body": str(e)}
+                    failures.append({"itemIdentifier": record_id})
+        return {
+            "batchItemFailures": failures,
+            "duplicates": duplicates,
+            "results": results,
+        }
+
     def parseEvent(self, event: KEYED) -> KEYED:
         if "detail" not in event:
             raise ValueError("No `detail` in event")
@@ -107,35 +403,157 @@ class GSAHandler:
             "uri": uri,
         }
 
-    def downloadReport(self, report_uri: str, root: Path) -> KEYED:
-        for temp_path in Constants.DownloadURI(report_uri):
+    def downloadReport(
+        self, report_uri: str, root: Path, collectors: Sequence[Any] = ()
+    ) -> KEYED:
+        from .gatk_report import GatkReportStream
+        from .report_cache import ReportCache
+
+        root = self.ReportRoot(report_uri)
+        run = Instrumentation.Current()
+        cache = self.reportCache()
+        key = ReportCache.Key(report_uri) if cache is not None else None
+        if cache is not None and key is not None:
+            cached = cache.get(key)
+            self.logger.info("downloadReport.cache", extra=cache.stats())
+            run.count("report_cache_misses" if cached is None else "report_cache_hits")
+            if cached is not None:
+                return self.downloadTables(cached, root, collectors)
+        for temp_path in run.timed(Constants.DownloadURI(report_uri), "download"):
             if temp_path.exists():
-                report = GatkReport(str(temp_path))
-                root = self.ReportRoot(report_uri)
-                return self.downloadTables(report, root)
+                report: Iterable[tuple[str, "DataFrame"]] = GatkReportStream(temp_path)
+                if cache is not None and key is not None:
+                    report = cache.store(key, report)
+                return self.downloadTables(report, root, collectors)
         return {}
 
-    def downloadTables(self, report: GatkReport, root: Path) -> KEYED:
+    def reportCache(self) -> Optional["ReportCache"]:
+        from .report_cache import ReportCache
+
+        path = self.cc.get("REPORT_CACHE")
+        if not path:
+            return None
+        max_bytes = int(self.cc.get("REPORT_CACHE_BYTES") or DEFAULT_CACHE_BYTES)
+        return ReportCache.Shared(path, max_bytes)
+
+    def tableFormats(self) -> list[str]:
+        setting = self.cc.get("TABLE_FORMAT") or DEFAULT_TABLE_FORMAT
+        return self.TableFormats(setting)
+
+    def downloadTables(
+        self,
+        report: Iterable[tuple[str, "DataFrame"]],
+        root: Path,
+        collectors: Sequence[Any] = (),
+    ) -> KEYED:
+        formats = self.tableFormats()
+        run = Instrumentation.Current()
         tables = {}
-        for name, table in report.tables.items():
-            dest = root / f"{name}.csv"
-            print(f"downloadTables: {name} -> {dest}")
-            table.to_csv(dest)
-            tables[name] = str(dest)
+        for name, table in run.timed(report, "parse"):
+            with run.stage("collect"):
+                for collector in collectors:
+                    collector.add(name, table)
+            for fmt in formats:
+                dest = root / f"{name}.{fmt}"
+                self.logger.debug(
+                    "downloadTables", extra={"table": name, "dest": str(dest)}
+                )
+                with run.stage(f"write.{name}"):
+                    self.WriteTable(table, dest)
+                run.count("tables_written")
+                tables[dest.name] = str(dest)
         return tables
 
-    def summarizeTables(self, tables: KEYED, root: Path) -> Path:
-        files = list(tables.values())
+    def summaryAssets(self) -> Optional["SummaryAssets"]:
+        from .summary_assets import SummaryAssets
+
+        if not self.cc.flag("SUMMARY_PREVIEWS"):
+            return None
+        rows = int(self.cc.get("PREVIEW_ROWS") or DEFAULT_PREVIEW_ROWS)
+        return SummaryAssets(preview_rows=rows)
+
+    def summarizeTables(
+        self, tables: KEYED, root: Path, entries: Optional[KEYED] = None
+    ) -> Path:
+        """List the tables, or only the small `entries` when given"""
+        files = list((entries or tables).values())
+        files = [self.RelativeEntry(file, root) for file in files]
         filename_list = json.dumps(files, ensure_ascii=True)
         sum: Path = root / self.cc.get("QUILT_SUMMARIZE")
         sum.write_text(filename_list)
         return sum
 
+    def configureTransfer(self) -> KEYED:
+        """
+        Apply TRANSFER_CONCURRENCY to quilt3 once per process, and rate
+        limit the S3 clients it builds from then on.
+
+        Only concurrency is tunable: quilt3 cuts push uploads on
+        `checksums.get_checksum_chunksize` boundaries so part checksums
+        line up with package hashes, whatever the transfer config says.
+        """
+        from quilt3 import data_transfer
+
+        with GSAHandler._transfer_lock:
+            if GSAHandler._transfer is None:
+                RateLimiter.InstallQuilt()
+                concurrency = self.cc.get("TRANSFER_CONCURRENCY")
+                if concurrency:
+                    data_transfer.MAX_CONCURRENCY = int(concurrency)
+                GSAHandler._transfer = {"concurrency": data_transfer.MAX_CONCURRENCY}
+            return GSAHandler._transfer
+
     def packageFolder(self, root: Path, opts: KEYED) -> KEYED:
-        parsed = self.ParseURI(opts["uri"])
-        print(f"packageFolder.parsed: {parsed}")
-        base_uri = f"quilt+s3://{parsed["bucket"]}#package={parsed["package"]}"
-        pkg = Package()
+        from .package_delta import PackageDelta
+
+        registry = f"s3://{self.ParseURI(opts['uri'])['bucket']}"
+        self.configureTransfer()  # before Browse builds its clients
+        meta = self.readMeta(root, opts)
+        prior = PackageDelta.Browse(opts["package"], registry)
+        manifest = self.runManifest(root).load()
+        return self.pushFolder(root, opts, meta, prior, manifest)
+
+    def checkpoint(self, opts: KEYED) -> Optional["PackageCheckpoint"]:
+        """Leased for CHECKPOINT_LEASE, else what is left of this invocation"""
+        from .package_checkpoint import PackageCheckpoint
+
+        if not self.cc.flag("CHECKPOINTS"):
+            return None
+        bucket = self.ParseURI(opts["uri"])["bucket"]
+        prefix = self.cc.get("CHECKPOINT_URI") or f"s3://{bucket}/{CHECKPOINT_PREFIX}"
+        batch_size = int(self.cc.get("CHECKPOINT_BATCH") or 0) or None
+        lease = self.cc.get("CHECKPOINT_LEASE")
+        uri = PackageCheckpoint.Uri(prefix, opts["package"])
+        return PackageCheckpoint(
+            uri,
+            batch_size=batch_size,
+            lease=self.remainingTime() if lease in (None, "") else int(lease),
+        )
+
+    def packageShards(self) -> Optional["PackageShards"]:
+        from .package_shards import PackageShards
+
+        shards = int(self.cc.get("HASH_SHARDS") or 1)
+        if shards < 2:
+            return None
+        mode = str(self.cc.get("HASH_SHARD_MODE") or "thread").lower()
+        function = self.cc.get("HASH_SHARD_FUNCTION")
+        piece_bytes = int(self.cc.get("HASH_SHARD_PIECE_BYTES") or 0) or None
+        return PackageShards(
+            shards, mode, function, piece_bytes, timeout=self.remainingTime()
+        )
+
+    def packageMeta(self) -> "PackageMeta":
+        from .package_meta import PackageMeta
+
+        return PackageMeta(int(self.cc.get("META_BUDGET") or 0) or None)
+
+    def runManifest(self, root: Path) -> "RunManifest":
+        from .run_manifest import RunManifest
+
+        return RunManifest(str(root), versioned=self.cc.flag("PIN_VERSIONS", "true"))
+
+    def readMeta(self, root: Path, opts: KEYED) -> KEYED:
         assert root.exists()
         assert root.is_dir()
 
@@ -151,20 +569,96 @@ class GSAHandler:
             meta["input"] = json.loads(text)
         meta["options"] = opts
         meta["context"] = self.context
+        return meta
 
-        root_folder = str(root)
-        pkg.set_dir(".", path=root_folder)
-        pkg.set_meta(meta)
+    def pushFolder(
+        self,
+        root: Path,
+        opts: KEYED,
+        meta: KEYED,
+        prior: Optional["Package"],
+        manifest: "RunManifest",
+        checkpoint: Optional["PackageCheckpoint"] = None,
+    ) -> KEYED:
+        from .package_delta import PackageDelta
+        from .package_meta import PackageMeta
+        from .s3_checksums import S3Checksums
 
-        print(f"packageFolder.opts: {opts}")
-        new_pkg = pkg.push(
-            opts["package"],
-            registry=f"s3://{parsed["bucket"]}",
-            message=json.dumps(opts, ensure_ascii=True),
-            force=True,
+        parsed = self.ParseURI(opts["uri"])
+        base_uri = f"quilt+s3://{parsed["bucket"]}#package={parsed["package"]}"
+        registry = f"s3://{parsed["bucket"]}"
+        pkg = manifest.package()
+        delta = PackageDelta(prior)
+        diff = delta.apply(pkg, manifest.sources())
+        self.logger.info(
+            "packageFolder.delta",
+            extra={"package": parsed["package"], "unchanged": delta.unchanged},
         )
-        print(f"packageFolder.new_pkg: {new_pkg}")
-        meta["top_hash"] = new_pkg.top_hash
-        meta["quilt+uri"] = f"{base_uri}@{new_pkg.top_hash}"
-        print(f"packageFolder.meta: {meta}")
+        run = Instrumentation.Current()
+        shards = self.packageShards()
+        if checkpoint is None:
+            checkpoint = self.claimCheckpoint(opts)
+        if checkpoint is not None and shards is not None:
+            checkpoint.hasher = shards.hash
+        if checkpoint is not None:
+            checkpoint.sources = manifest.sources()
+            with run.stage("resume"):
+                restored = checkpoint.restore(pkg)
+            self.logger.info(
+                "packageFolder.resume",
+                extra={"attempt": checkpoint.state["attempts"], "restored": restored},
+            )
+            run.count("hashes_restored", restored)
+        with run.stage("checksums"):
+            checksums = S3Checksums().apply(pkg)
+        self.logger.info("packageFolder.checksums", extra=checksums)
+        run.count("checksums_reused", checksums["reused"])
+        run.count("checksums_missing", checksums["missing"])
+        run.count("checksum_requests", checksums["requests"])
+        if checkpoint is not None:
+            with run.stage("hash"):
+                hashed = checkpoint.hash(pkg)
+            self.logger.info("packageFolder.hashed", extra=hashed)
+            run.count("checkpoint_saves", hashed["saves"])
+        elif shards is not None:
+            with run.stage("hash"):
+                hashed = shards.apply(pkg)
+            self.logger.info("packageFolder.hashed", extra=hashed)
+        if shards is not None:
+            run.count("hash_shards", shards.stats["shards"])
+            run.count("hash_pieces", shards.stats["pieces"])
+        with TemporaryDirectory() as scratch:
+            compact = self.packageMeta().apply(pkg, meta, Path(scratch))
+            self.logger.info("packageFolder.meta", extra=compact)
+            run.count("meta_bytes", compact["bytes"])
+            run.count("meta_external", len(compact["external"]))
+
+            top_hash = checkpoint.pushed(pkg) if checkpoint is not None else None
+            if top_hash is None:
+                transfer = self.configureTransfer()
+                self.logger.debug("packageFolder.transfer", extra=transfer)
+                with run.stage("push"):
+                    new_pkg = pkg.push(
+                        opts["package"],
+                        registry=registry,
+                        message=PackageMeta.Message(opts),
+                        selector_fn=self.InPlaceSelector(
+                            parsed["bucket"], opts["package"]
+                        ),
+                        force=True,
+                    )
+                top_hash = new_pkg.top_hash
+                self.logger.info("packageFolder.pushed", extra={"top_hash": top_hash})
+            else:
+                self.logger.info(
+                    "packageFolder.pushed",
+                    extra={"top_hash": top_hash, "already_pushed": True},
+                )
+        if checkpoint is not None:
+            checkpoint.complete(top_hash)
+        meta["delta"] = diff
+        meta["checksums"] = checksums
+        meta["top_hash"] = top_hash
+        meta["quilt+uri"] = f"{base_uri}@{top_hash}"
+        self.logger.info("packageFolder.done", extra={"quilt_uri": meta["quilt+uri"]})
         return meta
@@ -7,3 +7,13 @@ from .types import KEYED
 def handler(event: KEYED, context: Any) -> KEYED:
     handler = GSAHandler(context)
     return handler.handleEvent(event)
+
+
+def batch_handler(event: KEYED, context: Any) -> KEYED:
+    handler = GSAHandler(context)
+    return handler.handleBatch(event)
+
+
+def shard_handler(event: KEYED, context: Any) -> KEYED:
+    handler = GSAHandler(context)
+    return handler.handleShard(event)
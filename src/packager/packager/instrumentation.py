@@ -0,0 +1,132 @@
+import threading
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Generator, Iterable, Iterator, Optional, TypeVar
+
+from .types import KEYED
+
+NAMESPACE = "OmicsQuilt"
+SERVICE = "packager"
+MODES = ["off", "log", "emf"]
+
+T = TypeVar("T")
+
+
+class Instrumentation:
+    """
+    Per-run stage timers and counters.
+
+    `flush` writes one structured log line per run and, in `emf` mode, the
+    same numbers as CloudWatch embedded metrics. The instance for the
+    current run lives in a context variable, so `asyncio.to_thread`
+    workers record into it without passing it around.
+    """
+
+    _current: ContextVar[Optional["Instrumentation"]] = ContextVar(
+        "instrumentation", default=None
+    )
+
+    _logger: Any = None
+
+    @classmethod
+    def Logger(cls) -> Any:
+        # powertools is imported on first flush, not at cold start
+        if cls._logger is None:
+            from aws_lambda_powertools import Logger
+
+            cls._logger = Logger(service=SERVICE)
+        return cls._logger
+
+    @classmethod
+    def Current(cls) -> "Instrumentation":
+        return cls._current.get() or NOOP
+
+    @classmethod
+    @contextmanager
+    def Run(cls, mode: str = "log") -> Generator["Instrumentation", None, None]:
+        """Make a fresh instance current for the duration of one run"""
+        run = cls(mode)
+        token = cls._current.set(run)
+        try:
+            yield run
+        finally:
+            cls._current.reset(token)
+
+    def __init__(self, mode: str = "log") -> None:
+        mode = (mode or "log").lower()
+        if mode not in MODES:
+            raise ValueError(f"Unsupported INSTRUMENTATION: {mode}")
+        self.mode = mode
+        self.active = mode != "off"
+        self.timings: dict[str, float] = {}
+        self.counters: dict[str, float] = {}
+        self.units: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Generator[None, None, None]:
+        if not self.active:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, items: Iterable[T], name: str) -> Iterator[T]:
+        """Charge the time spent producing each item to stage `name`"""
+        if not self.active:
+            yield from items
+            return
+        iterator = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.record(name, time.perf_counter() - start)
+                return
+            self.record(name, time.perf_counter() - start)
+            yield item
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: float = 1, unit: str = "Count") -> None:
+        if not self.active:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            self.units[name] = unit
+
+    def report(self) -> KEYED:
+        return {
+            "timings_ms": {k: round(v * 1000, 3) for k, v in self.timings.items()},
+            "counters": dict(self.counters),
+        }
+
+    def flush(self, **metadata: str) -> KEYED:
+        report = self.report()
+        if not self.active:
+            return report
+        self.Logger().info("packager.run", extra={**metadata, **report})
+        if self.mode == "emf" and (self.timings or self.counters):
+            from aws_lambda_powertools.metrics import EphemeralMetrics, MetricUnit
+
+            metrics = EphemeralMetrics(namespace=NAMESPACE, service=SERVICE)
+            for name, ms in report["timings_ms"].items():
+                metrics.add_metric(name=name, unit=MetricUnit.Milliseconds, value=ms)
+            for name, total in self.counters.items():
+                unit = MetricUnit(self.units[name])
+                metrics.add_metric(name=name, unit=unit, value=total)
+            for key, value in metadata.items():
+                metrics.add_metadata(key=key, value=value)
+            metrics.flush_metrics()
+        return report
+
+
+NOOP = Instrumentation("off")
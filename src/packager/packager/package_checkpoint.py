@@ -0,0 +1,269 @@
+import fcntl
+import json
+import time
+
+from typing import Any, Callable, Optional
+
+from .constants import Constants
+from .instrumentation import Instrumentation
+from .rate_limiter import RateLimiter
+from .types import KEYED
+
+DEFAULT_BATCH_SIZE = 500
+# Lambda's longest timeout; an attempt still unfinished by then is gone
+DEFAULT_LEASE = 15 * 60
+NOT_FOUND = {"NoSuchKey", "404"}
+# another attempt rewrote the state between our read and our write
+CONFLICTS = {"PreconditionFailed", "ConditionalRequestConflict", "412", "409"}
+
+
+class CheckpointHeld(RuntimeError):
+    """Another attempt holds the lease; raised so the event is retried"""
+
+
+class PackageCheckpoint:
+    """
+    Packaging progress for one run, persisted so a retry can resume it.
+
+    The state object maps each hashed logical key to its hash and source
+    fingerprint. It is rewritten after every batch of hashes and records
+    the top hash once `push` lands. A retry restores hashes whose
+    fingerprint still matches and skips a push that already completed.
+    Each attempt leases the checkpoint for `lease` seconds: while an
+    unfinished attempt is `held`, another one backs off, and once it is
+    past its deadline it is `stalled` and the next attempt resumes it.
+    `acquire` takes the lease atomically, with a conditional write on S3
+    and a file lock locally, so two attempts cannot both claim it.
+    """
+
+    @staticmethod
+    def Uri(prefix: str, package: str) -> str:
+        return f"{prefix.rstrip('/')}/{package}.json"
+
+    @staticmethod
+    def Hash(entries: list[Any]) -> list[Any]:
+        """quilt3's parallel hashing; failures are returned, not raised"""
+        from quilt3 import checksums  # type: ignore
+        from quilt3.data_transfer import (  # type: ignore
+            FileChecksumTask,
+            calculate_multipart_checksum,
+        )
+
+        hash_type = checksums.DEFAULT_HASH
+        tasks = [
+            FileChecksumTask.create(entry.physical_key, entry.size, hash_type)
+            for entry in entries
+        ]
+        return [
+            (
+                result
+                if isinstance(result, Exception)
+                else {"type": hash_type, "value": result}
+            )
+            for result in calculate_multipart_checksum(tasks)
+        ]
+
+    @staticmethod
+    def Client() -> Any:
+        from quilt3.data_transfer import S3ClientProvider
+
+        # quilt3 only ever writes through its signed client
+        return RateLimiter.Install(S3ClientProvider().standard_client, "s3")
+
+    @staticmethod
+    def Parse(uri: str, text: str) -> KEYED:
+        try:
+            state: KEYED = json.loads(text)
+        except ValueError as e:
+            Instrumentation.Logger().warning(
+                "PackageCheckpoint.load: starting over",
+                extra={"checkpoint": uri, "error": str(e)},
+            )
+            state = {}
+        state.setdefault("entries", {})
+        return state
+
+    def __init__(
+        self,
+        uri: str,
+        sources: dict[str, KEYED] = {},
+        hasher: Optional[Callable[[list[Any]], list[Any]]] = None,
+        batch_size: Optional[int] = None,
+        lease: Optional[float] = None,
+        client: Optional[Any] = None,
+    ) -> None:
+        self.uri = uri
+        self.client = client
+        self.sources = sources
+        self.hasher = hasher or self.Hash
+        self.batch_size = batch_size or DEFAULT_BATCH_SIZE
+        self.lease = DEFAULT_LEASE if lease is None else lease
+        self.state: KEYED = {"entries": {}}
+        self.saves = 0
+
+    def load(self) -> "PackageCheckpoint":
+        path = Constants.ToPath(self.uri)
+        text = "{}"
+        try:
+            if path.exists():
+                text = path.read_text()
+        except Exception as e:
+            Instrumentation.Logger().warning(
+                "PackageCheckpoint.load: starting over",
+                extra={"checkpoint": self.uri, "error": str(e)},
+            )
+        self.state = self.Parse(self.uri, text)
+        return self
+
+    def save(self) -> None:
+        path = Constants.ToPath(self.uri)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(self.state))
+            self.saves += 1
+        except Exception as e:
+            Instrumentation.Logger().warning(
+                "PackageCheckpoint.save",
+                extra={"checkpoint": self.uri, "error": str(e)},
+            )
+
+    def stalled(self, now: Optional[float] = None) -> bool:
+        """An earlier attempt stopped before pushing and is past its deadline"""
+        deadline = self.state.get("deadline")
+        now = time.time() if now is None else now
+        return deadline is not None and not self.state.get("done") and now > deadline
+
+    def held(self, now: Optional[float] = None) -> bool:
+        """An unfinished attempt still within its lease"""
+        deadline = self.state.get("deadline")
+        now = time.time() if now is None else now
+        return deadline is not None and not self.state.get("done") and now <= deadline
+
+    def start(self, lease: Optional[float] = None) -> int:
+        self.state["attempts"] = self.state.get("attempts", 0) + 1
+        self.state["deadline"] = time.time() + (self.lease if lease is None else lease)
+        self.state["done"] = False
+        return int(self.state["attempts"])
+
+    def claim(self, lease: Optional[float] = None) -> int:
+        """Start an attempt, leasing the checkpoint for `lease` seconds"""
+        attempt = self.start(lease)
+        self.save()
+        return attempt
+
+    def check(self) -> None:
+        if self.held():
+            raise CheckpointHeld(
+                f"{self.uri}: attempt {self.state.get('attempts')} holds the lease"
+            )
+        if self.stalled():
+            Instrumentation.Logger().info(
+                "PackageCheckpoint.resume", extra={"checkpoint": self.uri}
+            )
+
+    def acquire(self, lease: Optional[float] = None) -> int:
+        """`claim` unless another attempt holds the lease, atomically"""
+        if self.uri.startswith("s3://"):
+            return self.acquireS3(lease)
+        path = Constants.ToPath(self.uri)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.load().check()
+            attempt = self.start(lease)
+            path.write_text(json.dumps(self.state))
+        self.saves += 1
+        return attempt
+
+    def acquireS3(self, lease: Optional[float] = None) -> int:
+        """Read the state and its ETag, then write only if it is unchanged"""
+        from botocore.exceptions import ClientError  # type: ignore
+        from quilt3.util import PhysicalKey  # type: ignore
+
+        physical_key = PhysicalKey.from_url(self.uri)
+        params = {"Bucket": physical_key.bucket, "Key": physical_key.path}
+        client = self.client or self.Client()
+        try:
+            response = client.get_object(**params)
+            text = response["Body"].read().decode()
+            condition = {"IfMatch": response["ETag"]}
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in NOT_FOUND:
+                raise
+            text = "{}"
+            condition = {"IfNoneMatch": "*"}
+        self.state = self.Parse(self.uri, text)
+        self.check()
+        attempt = self.start(lease)
+        try:
+            client.put_object(
+                **params, Body=json.dumps(self.state).encode(), **condition
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] in CONFLICTS:
+                raise CheckpointHeld(f"{self.uri}: claimed by another attempt") from e
+            raise
+        self.saves += 1
+        return attempt
+
+    def release(self) -> None:
+        """End a failed attempt's lease now, so a retry resumes at once"""
+        self.state["deadline"] = time.time()
+        self.save()
+
+    def fingerprint(self, entry: Any) -> KEYED:
+        from .package_delta import PackageDelta
+
+        return PackageDelta.Fingerprint(entry, self.sources)
+
+    def restore(self, pkg: Any) -> int:
+        """Reuse checkpointed hashes of unchanged entries; returns the count"""
+        saved = self.state["entries"]
+        restored = 0
+        for logical_key, entry in pkg.walk():
+            record = saved.get(logical_key)
+            if entry.hash is not None or record is None:
+                continue
+            if record["fingerprint"] == self.fingerprint(entry):
+                entry.hash = record["hash"]
+                restored += 1
+        return restored
+
+    def record(self, logical_key: str, entry: Any) -> None:
+        self.state["entries"][logical_key] = {
+            "fingerprint": self.fingerprint(entry),
+            "hash": entry.hash,
+        }
+
+    def hash(self, pkg: Any) -> KEYED:
+        """Hash the missing entries in batches, saving after each one"""
+        pending = []
+        for logical_key, entry in pkg.walk():
+            if entry.hash is None:
+                pending.append((logical_key, entry))
+            else:
+                self.record(logical_key, entry)
+        self.save()
+        hashed = 0
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start : start + self.batch_size]
+            results = self.hasher([entry for _, entry in batch])
+            errors = [result for result in results if isinstance(result, Exception)]
+            for (logical_key, entry), result in zip(batch, results):
+                if not isinstance(result, Exception):
+                    entry.hash = result
+                    self.record(logical_key, entry)
+                    hashed += 1
+            self.save()
+            if errors:
+                raise errors[0]
+        return {"hashed": hashed, "saves": self.saves}
+
+    def pushed(self, pkg: Any) -> Optional[str]:
+        """The top hash of an earlier push of this same package, if any"""
+        top_hash = self.state.get("top_hash")
+        return top_hash if top_hash and top_hash == pkg.top_hash else None
+
+    def complete(self, top_hash: str) -> None:
+        self.state.update(top_hash=top_hash, done=True)
+        self.save()
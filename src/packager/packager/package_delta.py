@@ -0,0 +1,93 @@
+import os
+
+from botocore.exceptions import ClientError  # type: ignore
+from quilt3 import Package  # type: ignore
+from typing import Any, Optional
+
+from .instrumentation import Instrumentation
+from .package_meta import META_FOLDER
+from .types import KEYED
+
+SOURCE_META = "source"
+# a first push: no latest pointer yet, or no registry bucket at all
+NOT_FOUND = {"NoSuchKey", "NoSuchBucket", "404"}
+
+
+class PackageDelta:
+    """
+    Compares a package being built against the previous revision.
+
+    Entries whose source fingerprint (size plus ETag/last-modified for S3,
+    or mtime for local files) is unchanged reuse the previous hash and
+    physical key, so only the delta is hashed and uploaded on push.
+    Fingerprints are kept in each entry's user metadata.
+    """
+
+    @staticmethod
+    def Browse(name: str, registry: str) -> Optional[Package]:
+        """The latest revision, or None if `name` was never pushed"""
+        try:
+            return Package.browse(name, registry=registry)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in NOT_FOUND:
+                raise
+            Instrumentation.Logger().info(
+                "PackageDelta.Browse: no prior revision",
+                extra={"package": name, "error": str(e)},
+            )
+            return None
+
+    @staticmethod
+    def Fingerprint(entry: Any, sources: dict[str, KEYED]) -> KEYED:
+        physical_key = entry.physical_key
+        fingerprint: KEYED = {"size": entry.size}
+        if physical_key.is_local():
+            stat = os.stat(physical_key.path)
+            fingerprint["mtime"] = stat.st_mtime_ns
+        else:
+            fingerprint.update(sources.get(physical_key.path, {}))
+            if physical_key.version_id:
+                fingerprint["version_id"] = physical_key.version_id
+        return fingerprint
+
+    def __init__(self, prior: Optional[Package]) -> None:
+        self.prior = prior
+        self.added: list[str] = []
+        self.changed: list[str] = []
+        self.removed: list[str] = []
+        self.unchanged = 0
+
+    def apply(self, pkg: Package, sources: dict[str, KEYED] = {}) -> KEYED:
+        """Reuse prior hashes for unchanged entries and record the diff"""
+        prior_keys = set()
+        if self.prior is not None:
+            # metadata entries are regenerated after the delta on every push
+            prior_keys = {
+                logical_key
+                for logical_key, _ in self.prior.walk()
+                if not logical_key.startswith(f"{META_FOLDER}/")
+            }
+        for logical_key, entry in pkg.walk():
+            fingerprint = self.Fingerprint(entry, sources)
+            entry.set_meta({**entry.meta, SOURCE_META: fingerprint})
+            if logical_key not in prior_keys:
+                self.added.append(logical_key)
+                continue
+            prior_keys.discard(logical_key)
+            old = self.prior[logical_key]  # type: ignore
+            if old.meta.get(SOURCE_META) == fingerprint and old.hash:
+                entry.hash = old.hash
+                entry.physical_key = old.physical_key
+                self.unchanged += 1
+            else:
+                self.changed.append(logical_key)
+        self.removed = sorted(prior_keys)
+        return self.to_dict()
+
+    def to_dict(self) -> KEYED:
+        return {
+            "added": self.added,
+            "changed": self.changed,
+            "removed": self.removed,
+            "unchanged": self.unchanged,
+        }
@@ -0,0 +1,109 @@
+import json
+import os
+import re
+
+from pathlib import Path
+from quilt3 import checksums  # type: ignore
+from quilt3.packages import PackageEntry  # type: ignore
+from quilt3.util import PhysicalKey  # type: ignore
+from typing import Any, Optional
+
+from .types import KEYED
+
+DEFAULT_BUDGET = 8 * 1024
+META_FOLDER = "_meta"
+MESSAGE_KEYS = ["type", "package", "uri", "time"]
+NOISE_KEYS = {"HOME", "HOSTNAME", "LANG", "LD_LIBRARY_PATH", "PATH", "PWD", "TZ"}
+NOISE_PREFIXES = ("AWS_", "LAMBDA_", "PYTHON", "_")
+UNSAFE = re.compile(r"[^\w-]")
+SECRETS = re.compile(r"SECRET|TOKEN|PASSWORD|CREDENTIAL|PRIVATE|_KEY$", re.IGNORECASE)
+
+
+class PackageMeta:
+    """
+    Package metadata kept within a size budget.
+
+    Small headline fields stay inline, where catalog listings and manifest
+    reads see them. Any field larger than a quarter of the budget, and then
+    the largest remaining fields until the rest fits, is written to
+    `_meta/<field>.json` inside the package, with unsafe characters in
+    the field name replaced by "_". The inline value becomes a reference
+    holding that entry's logical key, size and hash. `Clean` strips
+    environment variables and secrets from the handler context first.
+    """
+
+    HASH_TYPE = checksums.SHA256_CHUNKED_HASH_NAME
+
+    @staticmethod
+    def Noise(key: str, value: Any) -> bool:
+        if key in NOISE_KEYS or key.startswith(NOISE_PREFIXES) or SECRETS.search(key):
+            return True
+        return os.environ.get(key) == str(value)
+
+    @staticmethod
+    def Clean(context: KEYED) -> KEYED:
+        """The context without environment noise or secret-looking keys"""
+        return {k: v for k, v in context.items() if not PackageMeta.Noise(k, v)}
+
+    @staticmethod
+    def Message(opts: KEYED) -> str:
+        """A short commit message instead of the full options"""
+        return json.dumps({k: opts[k] for k in MESSAGE_KEYS if k in opts})
+
+    @staticmethod
+    def Size(value: Any) -> int:
+        return len(json.dumps(value, ensure_ascii=True, default=str))
+
+    def __init__(self, budget: Optional[int] = None) -> None:
+        self.budget = budget or DEFAULT_BUDGET
+        self.external: dict[str, tuple[bytes, KEYED]] = {}
+
+    def logicalKey(self, key: str) -> str:
+        """A file name for `key`, safe and unique within the package"""
+        name = UNSAFE.sub("_", key) or "_"
+        logical_key = f"{META_FOLDER}/{name}.json"
+        suffix = 1
+        while logical_key in self.external:
+            suffix += 1
+            logical_key = f"{META_FOLDER}/{name}_{suffix}.json"
+        return logical_key
+
+    def compact(self, meta: KEYED) -> KEYED:
+        """Inline metadata; externalized fields are kept in `external`"""
+        self.external = {}
+        inline = dict(meta)
+        if isinstance(inline.get("context"), dict):
+            inline["context"] = self.Clean(inline["context"])
+        sizes = {key: self.Size(value) for key, value in inline.items()}
+        total = self.Size(inline)
+        for key in sorted(sizes, key=lambda k: sizes[k], reverse=True):
+            if sizes[key] <= self.budget // 4 and total <= self.budget:
+                break
+            data = json.dumps(inline[key], indent=2, default=str).encode()
+            logical_key = self.logicalKey(key)
+            digest = self.hash(data)
+            self.external[logical_key] = (data, digest)
+            inline[key] = {"$ref": logical_key, "size": len(data), "hash": digest}
+            total += self.Size(inline[key]) - sizes[key]
+        return inline
+
+    def hash(self, data: bytes) -> KEYED:
+        value = checksums.calculate_multipart_checksum_bytes(
+            data, checksum_type=self.HASH_TYPE
+        )
+        return {"type": self.HASH_TYPE, "value": value}
+
+    def apply(self, pkg: Any, meta: KEYED, scratch: Path) -> KEYED:
+        """Set compact metadata and add the external files to `pkg`"""
+        inline = self.compact(meta)
+        for logical_key, (data, digest) in self.external.items():
+            path = scratch / logical_key
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            entry = PackageEntry(PhysicalKey.from_path(path), len(data), digest, None)
+            pkg.set(logical_key, entry)
+        pkg.set_meta(inline)
+        return {
+            "bytes": self.Size(inline),
+            "external": sorted(self.external),
+        }
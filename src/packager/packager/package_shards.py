@@ -0,0 +1,227 @@
+import base64
+import hashlib
+import heapq
+import json
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from quilt3 import checksums, data_transfer  # type: ignore
+from quilt3.util import PhysicalKey  # type: ignore
+from typing import Any, BinaryIO, Optional
+
+from .rate_limiter import RateLimiter
+from .s3_checksums import S3Checksums
+from .types import KEYED
+
+MODES = ["thread", "lambda", "process"]
+DEFAULT_PIECE_BYTES = 512 * 1024 * 1024
+# the longest a Lambda worker can run
+MAX_INVOKE_SECONDS = 15 * 60
+
+
+class PackageShards:
+    """
+    Hashing of missing package entries fanned out across N workers.
+
+    Entries are cut into pieces on quilt3's checksum-chunk boundaries, so a
+    single huge object spreads over several workers, and pieces are dealt
+    largest-first to the least-loaded shard. Each worker returns the
+    SHA-256 of every chunk in its shard, a partial manifest; `Combine`
+    joins those per entry into the `sha2-256-chunked` hash quilt3 would
+    compute, so the coordinator still makes a single `push`.
+
+    Workers run in a thread pool by default (hashlib releases the GIL),
+    as synchronous invocations of a Lambda function that serves
+    `shard_handler`, or, outside Lambda, which has no /dev/shm for
+    multiprocessing, in an opt-in local process pool.
+    """
+
+    HASH_TYPE = checksums.SHA256_CHUNKED_HASH_NAME
+
+    @staticmethod
+    def Pieces(entries: list[tuple[str, str, int]], piece_bytes: int) -> list[KEYED]:
+        """Split (key, url, size) entries into whole-chunk byte ranges"""
+        pieces = []
+        for key, url, size in entries:
+            chunksize = checksums.get_checksum_chunksize(size)
+            step = max(piece_bytes // chunksize, 1) * chunksize
+            for start in range(0, size, step):
+                pieces.append(
+                    {
+                        "key": key,
+                        "url": url,
+                        "start": start,
+                        "end": min(start + step, size),
+                        "chunksize": chunksize,
+                    }
+                )
+        return pieces
+
+    @staticmethod
+    def Partition(pieces: list[KEYED], shards: int) -> list[list[KEYED]]:
+        """Largest pieces first, each to the shard with the fewest bytes"""
+        loads = [(0, i) for i in range(shards)]
+        partition: list[list[KEYED]] = [[] for _ in range(shards)]
+        for piece in sorted(pieces, key=lambda p: p["end"] - p["start"], reverse=True):
+            load, i = heapq.heappop(loads)
+            partition[i].append(piece)
+            heapq.heappush(loads, (load + piece["end"] - piece["start"], i))
+        return [shard for shard in partition if shard]
+
+    @staticmethod
+    def ReadExactly(stream: BinaryIO, size: int) -> bytes:
+        data = b""
+        while len(data) < size:
+            block = stream.read(size - len(data))
+            if not block:
+                raise EOFError(f"expected {size} bytes, got {len(data)}")
+            data += block
+        return data
+
+    @staticmethod
+    def HashPiece(piece: KEYED, client: Optional[Any] = None) -> list[str]:
+        """SHA-256 of each chunk in the piece, from one ranged read"""
+        physical_key = PhysicalKey.from_url(piece["url"])
+        start, end, chunksize = piece["start"], piece["end"], piece["chunksize"]
+        if physical_key.is_local():
+            stream: Any = open(physical_key.path, "rb")
+            stream.seek(start)
+        else:
+            params = {
+                "Bucket": physical_key.bucket,
+                "Key": physical_key.path,
+                "Range": f"bytes={start}-{end - 1}",
+            }
+            if physical_key.version_id:
+                params["VersionId"] = physical_key.version_id
+            client = client or S3Checksums.Client(physical_key.bucket, params)
+            stream = client.get_object(**params)["Body"]
+        try:
+            digests = []
+            for offset in range(start, end, chunksize):
+                data = PackageShards.ReadExactly(stream, min(chunksize, end - offset))
+                digests.append(base64.b64encode(hashlib.sha256(data).digest()).decode())
+            return digests
+        finally:
+            stream.close()
+
+    @staticmethod
+    def HashShard(pieces: list[KEYED], client: Optional[Any] = None) -> list[KEYED]:
+        """Worker: the partial manifest for one shard"""
+        if client is None:
+            urls = dict.fromkeys(piece["url"] for piece in pieces)
+            clients = S3Checksums.Clients([PhysicalKey.from_url(url) for url in urls])
+        else:
+            clients = {}
+
+        def digest(piece: KEYED) -> list[str]:
+            bucket = PhysicalKey.from_url(piece["url"]).bucket
+            return PackageShards.HashPiece(piece, client or clients.get(bucket))
+
+        with ThreadPoolExecutor(max_workers=data_transfer.MAX_CONCURRENCY) as pool:
+            digests = list(pool.map(digest, pieces))
+        return [
+            {"key": piece["key"], "start": piece["start"], "digests": chunks}
+            for piece, chunks in zip(pieces, digests)
+        ]
+
+    @staticmethod
+    def Combine(keys: list[str], partials: list[KEYED]) -> dict[str, str]:
+        """Merge partial manifests into one quilt3 hash value per key"""
+        chunks: dict[str, list[str]] = {key: [] for key in keys}
+        for piece in sorted(partials, key=lambda p: (p["key"], p["start"])):
+            chunks[piece["key"]] += piece["digests"]
+        return {
+            key: base64.b64encode(
+                hashlib.sha256(
+                    b"".join(base64.b64decode(digest) for digest in digests)
+                ).digest()
+            ).decode()
+            for key, digests in chunks.items()
+        }
+
+    @staticmethod
+    def LambdaClient(timeout: Optional[float] = None) -> Any:
+        """
+        One client for every invocation. Reads wait as long as a worker may
+        run, and failed calls are not retried, since a retried synchronous
+        invoke would hash the whole shard again.
+        """
+        import boto3  # type: ignore
+        from botocore.config import Config  # type: ignore
+
+        config = Config(
+            read_timeout=timeout or MAX_INVOKE_SECONDS, retries={"max_attempts": 0}
+        )
+        return RateLimiter.Install(boto3.client("lambda", config=config), "lambda")
+
+    def __init__(
+        self,
+        shards: int,
+        mode: str = "thread",
+        function: Optional[str] = None,
+        piece_bytes: Optional[int] = None,
+        client: Optional[Any] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unsupported HASH_SHARD_MODE: {mode}")
+        if mode == "lambda" and not function:
+            raise ValueError("HASH_SHARD_MODE=lambda requires HASH_SHARD_FUNCTION")
+        self.shards = shards
+        self.mode = mode
+        self.function = function
+        self.piece_bytes = piece_bytes or DEFAULT_PIECE_BYTES
+        self.client = client
+        self.timeout = timeout
+        self.stats: KEYED = {"shards": 0, "pieces": 0, "bytes": 0}
+
+    def invoke(self, pieces: list[KEYED], client: Any) -> list[KEYED]:
+        response = client.invoke(
+            FunctionName=self.function,
+            Payload=json.dumps({"shard": pieces}).encode(),
+        )
+        payload = json.loads(response["Payload"].read())
+        if response.get("FunctionError"):
+            raise RuntimeError(f"PackageShards.invoke: {self.function}: {payload}")
+        return list(payload["pieces"])
+
+    def run(self, shards: list[list[KEYED]]) -> list[KEYED]:
+        if self.mode == "lambda":
+            client = self.client or self.LambdaClient(self.timeout)
+            with ThreadPoolExecutor(max_workers=len(shards)) as threads:
+                results = list(threads.map(lambda s: self.invoke(s, client), shards))
+        elif self.mode == "thread":
+            with ThreadPoolExecutor(max_workers=len(shards)) as threads:
+                results = list(
+                    threads.map(lambda s: self.HashShard(s, self.client), shards)
+                )
+        else:
+            # spawn, since forking a process with live boto3 threads can hang
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(len(shards), mp_context=context) as processes:
+                results = list(processes.map(self.HashShard, shards))
+        return [piece for result in results for piece in result]
+
+    def hash(self, entries: list[Any]) -> list[Any]:
+        """One hash per entry; a drop-in for `PackageCheckpoint.Hash`"""
+        keys = [str(i) for i in range(len(entries))]
+        work = [
+            (key, str(entry.physical_key), entry.size)
+            for key, entry in zip(keys, entries)
+        ]
+        pieces = self.Pieces(work, self.piece_bytes)
+        shards = self.Partition(pieces, self.shards)
+        partials = self.run(shards) if shards else []
+        self.stats["shards"] = max(self.stats["shards"], len(shards))
+        self.stats["pieces"] += len(pieces)
+        self.stats["bytes"] += sum(entry.size for entry in entries)
+        hashes = self.Combine(keys, partials)
+        return [{"type": self.HASH_TYPE, "value": hashes[key]} for key in keys]
+
+    def apply(self, pkg: Any) -> KEYED:
+        """Fill in every missing hash of the package; returns counts"""
+        pending = [entry for _, entry in pkg.walk() if entry.hash is None]
+        for entry, value in zip(pending, self.hash(pending)):
+            entry.hash = value
+        return {"hashed": len(pending), **self.stats}
@@ -0,0 +1,215 @@
+import threading
+import time
+
+from functools import partial
+from typing import Any, Callable, Optional
+
+from .instrumentation import Instrumentation
+from .types import KEYED
+
+THROTTLE_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "SlowDown",
+}
+# requests per second; SSM's standard throughput is 40 TPS per account
+DEFAULT_RATES = {"ssm": 40.0, "s3": 3500.0, "lambda": 100.0}
+BACKOFF = 0.5
+INCREASE = 0.05
+MIN_FRACTION = 0.02
+# refills accumulate float error, so a token is "whole" within EPSILON
+EPSILON = 1e-9
+
+
+class RateLimiter:
+    """
+    Token bucket per AWS service, shared by every client in the process.
+
+    `Install` hooks a boto3 client so each HTTP attempt, retries and
+    paginated pages included, first takes a token. Throttling responses
+    halve the refill rate and successes win it back a step at a time
+    (AIMD), so concurrent handlers settle near the service limit instead
+    of multiplying each other's retries. Rates come from the
+    `RATE_LIMIT_<SERVICE>` settings; 0 turns a service's limiter off.
+
+    `Setup` reads those settings once per process, so later `Constants`
+    never reset the buckets and their learned rates. `InstallQuilt` hooks
+    the S3 clients quilt3 builds, push included. The s3fs clients behind
+    UPath are not limited: they run on aiobotocore's event loop, where a
+    blocking wait for a token would stall every transfer in flight.
+    """
+
+    _shared: dict[str, "RateLimiter"] = {}
+    _rates: dict[str, float] = dict(DEFAULT_RATES)
+    _configured = False
+    _quilt_hooked = False
+    _lock = threading.Lock()
+
+    @classmethod
+    def Setup(cls, settings: KEYED) -> None:
+        """`Configure` from the first settings seen in this process"""
+        with cls._lock:
+            if cls._configured:
+                return
+        cls.Configure(settings)
+
+    @classmethod
+    def Configure(cls, settings: KEYED) -> None:
+        rates = dict(DEFAULT_RATES)
+        for service in rates:
+            value = settings.get(f"RATE_LIMIT_{service.upper()}")
+            if value not in (None, ""):
+                rates[service] = float(value)
+        with cls._lock:
+            cls._configured = True
+            if rates != cls._rates:
+                cls._rates = rates
+                cls._shared.clear()
+
+    @classmethod
+    def Shared(cls, service: str) -> Optional["RateLimiter"]:
+        with cls._lock:
+            if service not in cls._shared:
+                rate = cls._rates.get(service, 0.0)
+                if rate <= 0:
+                    return None
+                cls._shared[service] = cls(service, rate)
+            return cls._shared[service]
+
+    @classmethod
+    def ClearCache(cls) -> None:
+        with cls._lock:
+            cls._shared.clear()
+            cls._rates = dict(DEFAULT_RATES)
+            cls._configured = False
+
+    @classmethod
+    def Install(cls, client: Any, service: str) -> Any:
+        """Route every request of a boto3 client through `Shared(service)`"""
+        events = client.meta.events
+        # handlers look the limiter up per call, so `Configure` still applies
+        events.register(
+            "before-send",
+            partial(cls.OnSend, service),
+            unique_id=f"rate-limiter-send-{service}",
+        )
+        events.register(
+            "needs-retry",
+            partial(cls.OnResponse, service),
+            unique_id=f"rate-limiter-retry-{service}",
+        )
+        return client
+
+    @classmethod
+    def InstallQuilt(cls) -> None:
+        """`Install` on every S3 client quilt3 builds from now on"""
+        from quilt3 import hooks  # type: ignore
+
+        with cls._lock:
+            if cls._quilt_hooked:
+                return
+            cls._quilt_hooked = True
+            previous = hooks.get_build_s3_client_hook()
+
+        def build(base: Any, session: Any, client_kwargs: KEYED, **kwargs: Any) -> Any:
+            if previous is None:
+                client = base(session, client_kwargs, **kwargs)
+            else:
+                client = previous(base, session, client_kwargs, **kwargs)
+            return cls.Install(client, "s3")
+
+        hooks.set_build_s3_client_hook(build)
+
+    @classmethod
+    def OnSend(cls, service: str, **kwargs: Any) -> None:
+        limiter = cls.Shared(service)
+        if limiter is not None:
+            waited = limiter.acquire()
+            if waited:
+                Instrumentation.Current().record(f"throttle.{service}", waited)
+
+    @classmethod
+    def OnResponse(
+        cls, service: str, response: Optional[tuple[Any, KEYED]] = None, **kwargs: Any
+    ) -> None:
+        limiter = cls.Shared(service)
+        if limiter is None or response is None:
+            return
+        if cls.IsThrottle(response):
+            limiter.throttled()
+            Instrumentation.Current().count(f"{service}_throttles")
+        elif response[0].status_code < 400:
+            limiter.succeeded()
+
+    @staticmethod
+    def IsThrottle(response: tuple[Any, KEYED]) -> bool:
+        http_response, parsed = response
+        code = (parsed or {}).get("Error", {}).get("Code")
+        return code in THROTTLE_CODES or http_response.status_code == 429
+
+    def __init__(
+        self,
+        service: str,
+        rate: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.service = service
+        self.max_rate = rate
+        self.min_rate = max(rate * MIN_FRACTION, 0.5)
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.throttles = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """Block until a token is free; returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self.refill()
+                if self.tokens >= 1 - EPSILON:
+                    self.tokens -= 1
+                    self.waited += waited
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+
+    def throttled(self) -> None:
+        with self._lock:
+            self.refill()
+            self.throttles += 1
+            self.rate = max(self.min_rate, self.rate * BACKOFF)
+            self.capacity = max(self.rate, 1.0)
+            self.tokens = min(self.tokens, 0.0)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.refill()
+                self.rate = min(self.max_rate, self.rate + self.max_rate * INCREASE)
+                self.capacity = max(self.rate, 1.0)
+
+    def stats(self) -> KEYED:
+        return {
+            "rate": self.rate,
+            "max_rate": self.max_rate,
+            "throttles": self.throttles,
+            "waited": self.waited,
+        }
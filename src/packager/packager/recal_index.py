@@ -0,0 +1,147 @@
+import pandas as pd  # type: ignore
+import uuid
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+from .constants import Constants
+from .recal_summary import RecalSummary
+from .types import KEYED
+
+METRICS = "metrics"
+COVARIATES = "covariates"
+COMPACTED = "compacted-"
+
+
+class RecalIndex:
+    """
+    Append-only, date-partitioned Parquet index of per-run recal metrics.
+
+    Each packaged run adds one small file per table under
+    `<uri>/<table>/date=YYYY-MM-DD/`, named so a re-run of the same run
+    adds a newer file instead of replacing the old one. `read` only opens
+    the partitions in the date range. `compact` merges a partition into a
+    single file, keeping each run's newest rows; the handler never calls
+    it, since concurrent containers append to the same partitions, so run
+    it from a scheduled maintenance job once a partition's day is over.
+    """
+
+    @staticmethod
+    def RunId(package: str) -> str:
+        return package.replace("/", "_")
+
+    @staticmethod
+    def FileName(run_id: str) -> str:
+        """Unique per append, and sorting by name sorts by append time"""
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        return f"{stamp}-{run_id}-{uuid.uuid4().hex[:8]}.parquet"
+
+    @staticmethod
+    def Partition(timestamp: str) -> str:
+        day = datetime.fromisoformat(timestamp.replace("Z", "+00:00")).date()
+        return f"date={day.isoformat()}"
+
+    def __init__(self, uri: str) -> None:
+        self.root = Constants.ToPath(uri)
+
+    def append(self, opts: KEYED, meta: KEYED, summary: RecalSummary) -> KEYED:
+        """Add one run; returns the files written, keyed by table"""
+        run_id = self.RunId(opts["package"])
+        partition = self.Partition(opts["time"])
+        metrics = {
+            "run_id": run_id,
+            "package": opts["package"],
+            "time": opts["time"],
+            "top_hash": meta.get("top_hash"),
+            "quilt_uri": meta.get("quilt+uri"),
+            **summary.headline(),
+        }
+        frames = {METRICS: pd.DataFrame([metrics])}
+        if summary.covariates is not None:
+            frames[COVARIATES] = summary.covariates.assign(run_id=run_id)
+
+        written = {}
+        for table, frame in frames.items():
+            folder = self.root / table / partition
+            folder.mkdir(parents=True, exist_ok=True)
+            dest = folder / self.FileName(run_id)
+            self.write(frame, dest)
+            written[table] = str(dest)
+        return written
+
+    def partitions(
+        self, table: str, since: Optional[str] = None, until: Optional[str] = None
+    ) -> list[Path]:
+        folder = self.root / table
+        if not folder.exists():
+            return []
+        found = []
+        for partition in sorted(folder.iterdir(), key=lambda p: p.name):
+            day = partition.name.removeprefix("date=")
+            if since and day < since or until and day > until:
+                continue
+            found.append(partition)
+        return found
+
+    def read(
+        self,
+        table: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        columns: Optional[list[str]] = None,
+    ) -> pd.DataFrame:
+        """Rows of `table` for runs dated within [since, until] (YYYY-MM-DD)"""
+        frames = []
+        for partition in self.partitions(table, since, until):
+            day = partition.name.removeprefix("date=")
+            for path in sorted(partition.glob("*.parquet"), key=lambda p: p.name):
+                frame = self.load(path, columns)
+                frames.append(frame.assign(date=day))
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def drift(
+        self,
+        covariate: str = "Cycle",
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Quality delta per covariate value (rows) and run (columns)"""
+        frame = self.read(COVARIATES, since, until)
+        if frame.empty:
+            return frame
+        frame = frame[frame["CovariateName"] == covariate]
+        return frame.pivot_table(
+            index="CovariateValue", columns="run_id", values="Delta", aggfunc="mean"
+        )
+
+    def compact(self, table: str, partition: str) -> Optional[str]:
+        """Merge a partition's files into one, keeping the newest rows per run"""
+        folder = self.root / table / partition
+        paths = sorted(
+            folder.glob("*.parquet"),
+            key=lambda p: (not p.name.startswith(COMPACTED), p.name),
+        )
+        if len(paths) < 2:
+            return None
+        frames = [self.load(path).assign(_file=i) for i, path in enumerate(paths)]
+        frame = pd.concat(frames, ignore_index=True)
+        newest = frame.groupby("run_id")["_file"].transform("max")
+        frame = frame[frame["_file"] == newest].drop(columns="_file")
+        dest = folder / f"{COMPACTED}{uuid.uuid4().hex}.parquet"
+        self.write(frame, dest)
+        for path in paths:
+            path.unlink()
+        return str(dest)
+
+    @staticmethod
+    def load(path: Path, columns: Optional[list[str]] = None) -> Any:
+        with path.open("rb") as fh:
+            return pd.read_parquet(fh, columns=columns)
+
+    @staticmethod
+    def write(frame: pd.DataFrame, dest: Path) -> None:
+        with dest.open("wb") as fh:
+            frame.to_parquet(fh, compression="zstd", index=False)
@@ -0,0 +1,135 @@
+import json
+import numpy as np
+
+from pandas import DataFrame  # type: ignore
+from pathlib import Path
+from typing import Callable, Optional
+
+from .types import KEYED
+
+SUMMARY_JSON = "recal_summary.json"
+COVARIATES_TABLE = "recal_covariates"
+
+
+class RecalSummary:
+    """
+    Aggregates BQSR recalibration tables as they stream past.
+
+    Call `add` with each `(name, DataFrame)` from the report; unrecognised
+    tables are ignored. Every aggregate is a single vectorized groupby, so
+    RecalTable2 is read exactly once.
+    """
+
+    @staticmethod
+    def Weighted(frame: DataFrame, column: str, keys: list[str]) -> DataFrame:
+        """Observation-weighted mean of `column`, with summed counts"""
+        weighted = frame.assign(
+            _weighted=frame[column] * frame["Observations"],
+        )
+        grouped = weighted.groupby(keys, sort=True, observed=True).agg(
+            Observations=("Observations", "sum"),
+            Errors=("Errors", "sum"),
+            _weighted=("_weighted", "sum"),
+            Values=(column, "size"),
+        )
+        observations = grouped["Observations"].to_numpy(dtype=float)
+        grouped[column] = np.divide(
+            grouped["_weighted"].to_numpy(dtype=float),
+            observations,
+            out=np.zeros_like(observations),
+            where=observations > 0,
+        )
+        return grouped.drop(columns="_weighted").reset_index()
+
+    def __init__(self) -> None:
+        self.read_groups: Optional[DataFrame] = None
+        self.quality: Optional[DataFrame] = None
+        self.covariates: Optional[DataFrame] = None
+        self.covariate_totals: Optional[DataFrame] = None
+
+    def add(self, name: str, table: DataFrame) -> None:
+        if name == "RecalTable0":
+            self.read_groups = table.assign(
+                Delta=table["EmpiricalQuality"] - table["EstimatedQReported"],
+            )[
+                [
+                    "ReadGroup",
+                    "EventType",
+                    "EstimatedQReported",
+                    "EmpiricalQuality",
+                    "Delta",
+                    "Observations",
+                    "Errors",
+                ]
+            ]
+        elif name == "RecalTable1":
+            delta = table.assign(
+                Delta=table["EmpiricalQuality"] - table["QualityScore"],
+            )
+            keys = ["ReadGroup", "QualityScore", "EventType"]
+            self.quality = self.Weighted(delta, "Delta", keys)
+        elif name == "RecalTable2":
+            delta = table.assign(
+                Delta=table["EmpiricalQuality"] - table["QualityScore"],
+            )
+            keys = ["ReadGroup", "CovariateName", "CovariateValue", "EventType"]
+            self.covariates = self.Weighted(delta, "Delta", keys)
+            totals = self.covariates.groupby(
+                ["ReadGroup", "CovariateName", "EventType"], sort=True
+            )["Delta"].agg(["min", "max"])
+            self.covariate_totals = totals.reset_index()
+
+    def headline(self) -> KEYED:
+        """Small enough to embed in the package metadata"""
+        headline: KEYED = {}
+        if self.read_groups is not None:
+            observations = int(self.read_groups["Observations"].sum())
+            errors = float(self.read_groups["Errors"].sum())
+            headline["read_groups"] = int(self.read_groups["ReadGroup"].nunique())
+            headline["observations"] = observations
+            headline["errors"] = errors
+            headline["error_rate"] = errors / observations if observations else 0.0
+            weights = self.read_groups["Observations"]
+            if weights.sum() > 0:
+                delta = np.average(self.read_groups["Delta"], weights=weights)
+                headline["quality_delta"] = round(float(delta), 4)
+        if self.covariate_totals is not None:
+            spread = self.covariate_totals.assign(
+                Spread=self.covariate_totals["max"] - self.covariate_totals["min"]
+            )
+            for covariate, value in (
+                spread.groupby("CovariateName")["Spread"].max().items()
+            ):
+                headline[f"{str(covariate).lower()}_delta_spread"] = round(
+                    float(value), 4
+                )
+        return headline
+
+    def to_dict(self) -> KEYED:
+        summary: KEYED = {"headline": self.headline()}
+        for key, frame in [
+            ("read_groups", self.read_groups),
+            ("quality", self.quality),
+            ("covariates", self.covariate_totals),
+        ]:
+            if frame is not None:
+                summary[key] = frame.to_dict(orient="records")
+        return summary
+
+    def write(
+        self,
+        root: Path,
+        formats: list[str],
+        writer: Callable[[DataFrame, Path], None],
+    ) -> KEYED:
+        """Write the JSON summary and per-covariate table, keyed by file name"""
+        files = {}
+        dest = root / SUMMARY_JSON
+        dest.write_text(json.dumps(self.to_dict(), indent=2, default=float))
+        files[dest.name] = str(dest)
+        if self.covariates is not None:
+            for fmt in formats:
+                dest = root / f"{COVARIATES_TABLE}.{fmt}"
+                writer(self.covariates, dest)
+                files[dest.name] = str(dest)
+        return files
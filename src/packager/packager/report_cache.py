@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+
+from contextlib import suppress
+from pandas import DataFrame, read_parquet  # type: ignore
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from upath import UPath
+
+from .constants import Constants
+from .gatk_report import GatkReportStream
+from .types import KEYED
+
+TABLES_JSON = "tables.json"
+
+
+class ReportCache:
+    """
+    Content-addressed cache of parsed report tables on local disk or EFS.
+
+    Entries are keyed by the source object's identity (ETag/version for S3,
+    size/mtime for local files) plus the parser version, stored as one
+    Parquet file per table, and evicted least-recently-used once the cache
+    exceeds `max_bytes`.
+    """
+
+    _shared: dict[str, "ReportCache"] = {}
+    # handleBatch workers share these instances
+    _lock = threading.Lock()
+
+    @classmethod
+    def Shared(cls, path: str, max_bytes: int) -> "ReportCache":
+        key = f"{path}:{max_bytes}"
+        with cls._lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(Path(path), max_bytes)
+            return cls._shared[key]
+
+    @staticmethod
+    def Key(uri: str) -> Optional[str]:
+        """Digest of the object's identity, or None if it does not exist"""
+        file_path = Constants.ToPath(uri)
+        try:
+            if isinstance(file_path, UPath):
+                info = file_path.fs.info(file_path.path)  # one HEAD
+                fields = ["ETag", "VersionId", "size", "LastModified"]
+                identity = {k: str(info[k]) for k in fields if info.get(k) is not None}
+            else:
+                stat = file_path.stat()
+                identity = {"size": str(stat.st_size), "mtime": str(stat.st_mtime_ns)}
+                identity["uri"] = str(file_path)
+        except FileNotFoundError:
+            return None
+        identity["parser"] = GatkReportStream.VERSION
+        text = json.dumps(identity, sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Iterator[tuple[str, DataFrame]]]:
+        entry = self.root / key
+        index = entry / TABLES_JSON
+        if not index.exists():
+            self.misses += 1
+            return None
+        self.hits += 1
+        os.utime(entry)  # mark as recently used
+        names = json.loads(index.read_text())
+        return ((name, read_parquet(entry / f"{name}.parquet")) for name in names)
+
+    def store(
+        self, key: str, tables: Iterable[tuple[str, DataFrame]]
+    ) -> Iterator[tuple[str, DataFrame]]:
+        """Pass tables through while writing them, committing at the end"""
+        staging = self.root / f".{key}.{uuid.uuid4().hex}"
+        staging.mkdir(parents=True)
+        names = []
+        try:
+            for name, table in tables:
+                table.to_parquet(staging / f"{name}.parquet", index=False)
+                names.append(name)
+                yield name, table
+            (staging / TABLES_JSON).write_text(json.dumps(names))
+            try:
+                staging.rename(self.root / key)
+            except OSError:
+                pass  # another writer committed the same content first
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> list[str]:
+        # other workers and containers may remove entries while we look
+        usage: list[tuple[float, Path, int]] = []
+        for entry in self.root.iterdir():
+            if entry.name.startswith("."):
+                continue
+            with suppress(FileNotFoundError):
+                size = sum(f.stat().st_size for f in entry.iterdir())
+                usage.append((entry.stat().st_mtime, entry, size))
+        usage.sort(key=lambda item: item[0])
+        total = sum(size for _, _, size in usage)
+        evicted = []
+        for _, entry, size in usage:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            evicted.append(entry.name)
+        return evicted
+
+    def stats(self) -> KEYED:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,130 @@
+from pathlib import Path
+from quilt3 import Package  # type: ignore
+from quilt3.data_transfer import S3Api, S3ClientProvider  # type: ignore
+from quilt3.packages import PackageEntry  # type: ignore
+from quilt3.util import PhysicalKey  # type: ignore
+from typing import Any, Optional
+
+from .instrumentation import Instrumentation
+from .rate_limiter import RateLimiter
+from .types import KEYED
+
+
+class RunManifest:
+    """
+    Every object under a run folder, from a single paginated listing.
+
+    On S3, one `ListObjectsV2` pass (or `ListObjectVersions` when pinning
+    versions, since only that call returns them) supplies size, ETag and
+    version, so package entries are built without any per-object HEAD.
+    Only objects written after the listing (extractor tables) are added
+    one HEAD at a time.
+    """
+
+    @staticmethod
+    def Client(bucket: str, operation: str, params: KEYED) -> Any:
+        apis = {
+            "list_object_versions": S3Api.LIST_OBJECT_VERSIONS,
+            "head_object": S3Api.HEAD_OBJECT,
+        }
+        api = apis.get(operation, S3Api.LIST_OBJECTS_V2)
+        client = S3ClientProvider().find_correct_client(api, bucket, params)
+        return RateLimiter.Install(client, "s3")
+
+    def __init__(
+        self, root_url: str, versioned: bool = False, client: Optional[Any] = None
+    ) -> None:
+        self.root_url = root_url
+        self.versioned = versioned
+        self.client = client
+        self.requests = 0
+        self.objects: dict[str, KEYED] = {}
+        self.is_s3 = root_url.startswith("s3://")
+        if self.is_s3:
+            root = PhysicalKey.from_url(root_url)
+            self.bucket = root.bucket
+            self.prefix = root.path.rstrip("/") + "/"
+
+    def load(self) -> "RunManifest":
+        self.objects = self.listS3() if self.is_s3 else self.listLocal()
+        Instrumentation.Logger().info(
+            "RunManifest.load",
+            extra={"objects": len(self.objects), "requests": self.requests},
+        )
+        return self
+
+    def listS3(self) -> dict[str, KEYED]:
+        operation = "list_object_versions" if self.versioned else "list_objects_v2"
+        params = {"Bucket": self.bucket, "Prefix": self.prefix}
+        client = self.client or self.Client(self.bucket, operation, params)
+        objects = {}
+        for page in client.get_paginator(operation).paginate(**params):
+            self.requests += 1
+            for obj in page.get("Versions" if self.versioned else "Contents", []):
+                if obj["Key"].endswith("/") or not obj.get("IsLatest", True):
+                    continue
+                objects[obj["Key"][len(self.prefix) :]] = {
+                    "key": obj["Key"],
+                    "size": obj["Size"],
+                    "etag": obj["ETag"].strip('"'),
+                    "last_modified": obj["LastModified"].isoformat(),
+                    "version_id": obj.get("VersionId") if self.versioned else None,
+                }
+        return objects
+
+    def listLocal(self) -> dict[str, KEYED]:
+        root = Path(self.root_url)
+        objects = {}
+        for path in root.rglob("*"):
+            if path.is_file():
+                objects[path.relative_to(root).as_posix()] = {
+                    "key": str(path),
+                    "size": path.stat().st_size,
+                }
+        return objects
+
+    def add(self, uri: str) -> None:
+        """Record an object written since `load`, rather than listing again"""
+        if not self.is_s3:
+            path = Path(uri)
+            logical_key = path.relative_to(Path(self.root_url)).as_posix()
+            self.objects[logical_key] = {"key": str(path), "size": path.stat().st_size}
+            return
+        key = PhysicalKey.from_url(uri).path
+        params = {"Bucket": self.bucket, "Key": key}
+        client = self.client or self.Client(self.bucket, "head_object", params)
+        head = client.head_object(**params)
+        self.requests += 1
+        self.objects[key[len(self.prefix) :]] = {
+            "key": key,
+            "size": head["ContentLength"],
+            "etag": head["ETag"].strip('"'),
+            "last_modified": head["LastModified"].isoformat(),
+            "version_id": head.get("VersionId") if self.versioned else None,
+        }
+
+    def keys(self) -> list[str]:
+        return sorted(self.objects)
+
+    def sources(self) -> dict[str, KEYED]:
+        """ETag and last-modified by S3 key, for `PackageDelta.Fingerprint`"""
+        if not self.is_s3:
+            return {}
+        return {
+            obj["key"]: {"etag": obj["etag"], "last_modified": obj["last_modified"]}
+            for obj in self.objects.values()
+        }
+
+    def physicalKey(self, obj: KEYED) -> PhysicalKey:
+        if self.is_s3:
+            return PhysicalKey(self.bucket, obj["key"], obj.get("version_id"))
+        return PhysicalKey.from_path(obj["key"])
+
+    def package(self, pkg: Optional[Package] = None) -> Package:
+        """Add an entry per object, as `set_dir` would, but from the listing"""
+        pkg = Package() if pkg is None else pkg
+        for logical_key in self.keys():
+            obj = self.objects[logical_key]
+            entry = PackageEntry(self.physicalKey(obj), obj["size"], None, None)
+            pkg.set(logical_key, entry)
+        return pkg
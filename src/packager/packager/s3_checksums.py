@@ -0,0 +1,168 @@
+import base64
+import hashlib
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from quilt3 import Package, checksums, data_transfer  # type: ignore
+from quilt3.data_transfer import S3Api, S3ClientProvider  # type: ignore
+from quilt3.util import PhysicalKey  # type: ignore
+from typing import Any, Optional
+
+from .instrumentation import Instrumentation
+from .rate_limiter import RateLimiter
+from .types import KEYED
+
+ATTRIBUTES = ["Checksum", "ObjectParts", "ObjectSize"]
+
+
+class S3Checksums:
+    """
+    Package hashes derived from the SHA-256 checksums S3 already stores.
+
+    quilt3's `sha2-256-chunked` hash is the SHA-256 of the concatenated
+    per-chunk digests, which equals S3's composite checksum whenever the
+    upload parts line up with quilt3's chunk size. Entries whose checksum
+    is missing or misaligned keep `hash=None`, so `push` falls back to its
+    parallel ranged-read hashing for just those objects.
+    """
+
+    HASH_TYPE = checksums.SHA256_CHUNKED_HASH_NAME
+    MAX_PARTS = 1000
+
+    @staticmethod
+    def Client(bucket: str, params: KEYED) -> Any:
+        client = S3ClientProvider().find_correct_client(
+            S3Api.GET_OBJECT, bucket, params
+        )
+        return RateLimiter.Install(client, "s3")
+
+    @staticmethod
+    def QuiltHash(size: int, attributes: KEYED) -> Optional[str]:
+        """The quilt3 hash implied by GetObjectAttributes, if it has one"""
+        if size == 0:
+            return str(
+                checksums.calculate_multipart_checksum_bytes(
+                    b"", checksum_type=S3Checksums.HASH_TYPE
+                )
+            )
+        parts = attributes.get("ObjectParts", {}).get("Parts", [])
+        if not parts:
+            checksum = attributes.get("Checksum", {}).get("ChecksumSHA256")
+            if checksum is None or checksums.is_mpu(size):
+                return None  # a whole-object digest only matches a single chunk
+            parts = [{"ChecksumSHA256": checksum, "Size": size}]
+        chunksize = checksums.get_checksum_chunksize(size)
+        *head, last = parts
+        if any(part.get("ChecksumSHA256") is None for part in parts):
+            return None
+        if any(part["Size"] != chunksize for part in head) or last["Size"] > chunksize:
+            return None
+        digests = b"".join(base64.b64decode(part["ChecksumSHA256"]) for part in parts)
+        return base64.b64encode(hashlib.sha256(digests).digest()).decode()
+
+    @staticmethod
+    def Params(physical_key: PhysicalKey) -> KEYED:
+        params: KEYED = {"Bucket": physical_key.bucket, "Key": physical_key.path}
+        if physical_key.version_id:
+            params["VersionId"] = physical_key.version_id
+        return params
+
+    @staticmethod
+    def Clients(physical_keys: list[PhysicalKey]) -> dict[str, Any]:
+        """One client per bucket, probed with the bucket's first object"""
+        clients: dict[str, Any] = {}
+        for physical_key in physical_keys:
+            bucket = physical_key.bucket
+            if physical_key.is_local() or bucket in clients:
+                continue
+            try:
+                params = S3Checksums.Params(physical_key)
+                clients[bucket] = S3Checksums.Client(bucket, params)
+            except Exception as e:
+                Instrumentation.Logger().warning(
+                    "S3Checksums.Clients", extra={"bucket": bucket, "error": str(e)}
+                )
+                clients[bucket] = None
+        return clients
+
+    def __init__(
+        self, client: Optional[Any] = None, max_workers: Optional[int] = None
+    ) -> None:
+        self.client = client
+        self.max_workers = max_workers or data_transfer.MAX_CONCURRENCY
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def clients(self, pending: list[Any]) -> dict[str, Any]:
+        if self.client is not None:
+            return {entry.physical_key.bucket: self.client for entry in pending}
+        return self.Clients([entry.physical_key for entry in pending])
+
+    def attributes(self, physical_key: PhysicalKey, client: Any) -> KEYED:
+        """GetObjectAttributes, following the part list across pages"""
+        params: KEYED = {
+            **self.Params(physical_key),
+            "ObjectAttributes": ATTRIBUTES,
+            "MaxParts": self.MAX_PARTS,
+        }
+        attributes: KEYED = {}
+        parts: list[KEYED] = []
+        while True:
+            with self._lock:
+                self.requests += 1
+            response = client.get_object_attributes(**params)
+            attributes = {**response, **attributes}
+            object_parts = response.get("ObjectParts", {})
+            parts += object_parts.get("Parts", [])
+            if not object_parts.get("IsTruncated"):
+                break
+            params["PartNumberMarker"] = object_parts["NextPartNumberMarker"]
+        if parts:
+            attributes["ObjectParts"] = {**attributes["ObjectParts"], "Parts": parts}
+        return attributes
+
+    def lookup(
+        self, physical_key: PhysicalKey, size: int, client: Optional[Any]
+    ) -> Optional[str]:
+        if size == 0:
+            return self.QuiltHash(size, {})
+        if client is None:
+            return None
+        try:
+            return self.QuiltHash(size, self.attributes(physical_key, client))
+        except Exception as e:
+            Instrumentation.Logger().warning(
+                "S3Checksums.lookup",
+                extra={"physical_key": str(physical_key), "error": str(e)},
+            )
+            return None
+
+    def apply(self, pkg: Package) -> KEYED:
+        """Fill in missing hashes of S3 entries; returns counts"""
+        pending = [
+            entry
+            for _, entry in pkg.walk()
+            if entry.hash is None and not entry.physical_key.is_local()
+        ]
+        clients = self.clients([entry for entry in pending if entry.size])
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            hashes = list(
+                pool.map(
+                    lambda entry: self.lookup(
+                        entry.physical_key,
+                        entry.size,
+                        clients.get(entry.physical_key.bucket),
+                    ),
+                    pending,
+                )
+            )
+        reused = 0
+        for entry, value in zip(pending, hashes):
+            if value is not None:
+                entry.hash = {"type": self.HASH_TYPE, "value": value}
+                reused += 1
+        return {
+            "reused": reused,
+            "missing": len(pending) - reused,
+            "requests": self.requests,
+        }
@@ -20,11 +20,12 @@
 # SOFTWARE.
 # ==============================================================================
 
-import boto3  # type: ignore
-
 # from botocore.exceptions import ClientError
-import datetime
+import threading
+
 from typing import Any, List, Optional, TYPE_CHECKING
+from .rate_limiter import RateLimiter
+from .ttl_cache import TTLCache
 from .types import KEYED
 
 if TYPE_CHECKING:
@@ -32,42 +33,126 @@ if TYPE_CHECKING:
 
 
 class SSMParameterStore(object):
+    # get_parameters accepts at most ten names
+    BATCH_SIZE = 10
+    MAX_VALUES = 1024
+    MAX_SUBSTORES = 64
+
+    # reused across warm Lambda invocations
+    _clients: KEYED = {}
+    _shared: dict[str, "SSMParameterStore"] = {}
+    # batch workers share these; boto3's default session is not thread-safe
+    _lock = threading.RLock()
+
+    @classmethod
+    def Client(cls, region: str) -> "BaseClient":
+        with cls._lock:
+            if region not in cls._clients:
+                import boto3  # type: ignore
+
+                client = boto3.client("ssm", region_name=region)
+                cls._clients[region] = RateLimiter.Install(client, "ssm")
+            return cls._clients[region]
+
+    @classmethod
+    def Shared(
+        cls,
+        prefix: Optional[str] = None,
+        region: str = "us-east-1",
+        ttl: Optional[int] = None,
+    ) -> "SSMParameterStore":
+        key = f"{prefix}:{region}:{ttl}"
+        with cls._lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(prefix, region, ttl)
+            return cls._shared[key]
+
+    @classmethod
+    def ClearCache(cls) -> None:
+        with cls._lock:
+            cls._clients.clear()
+            cls._shared.clear()
+
     def __init__(
         self,
         prefix: Optional[str] = None,
         region: str = "us-east-1",
         ttl: Optional[int] = None,
+        maxsize: Optional[int] = None,
     ) -> None:
         base = (prefix or "").strip("/").lstrip("SSM")
         self._prefix = f"/{base}/" if base else "/"
         self._region = region
-        self._client: BaseClient = boto3.client("ssm", region_name=region)
-        self._keys: KEYED = {}
-        self._substores: KEYED = {}
+        self._lazy_client: Optional[BaseClient] = None
+        self._keys: Optional[KEYED] = None
+        # ttl=None caches until evicted, ttl=0 (or False) always refetches
         self._ttl = ttl
+        self._maxsize = self.MAX_VALUES if maxsize is None else maxsize
+        self._values = TTLCache(self._maxsize, ttl)
+        self._substores = TTLCache(self.MAX_SUBSTORES)
+        # guards the key listing, which `put` updates in place
+        self._keys_lock = threading.RLock()
+
+    @property
+    def _client(self) -> "BaseClient":
+        # created on first call, so constructing a store never imports boto3
+        if self._lazy_client is None:
+            self._lazy_client = self.Client(self._region)
+        return self._lazy_client
+
+    @_client.setter
+    def _client(self, client: "BaseClient") -> None:
+        self._lazy_client = client
 
     def get(self, name: str, **kwargs: Any) -> Any:
         assert name, "Name can not be empty"
-        if self._keys is None:
-            self.refresh()
-
         abs_key = "%s%s" % (self._prefix, name)
-        if name not in self._keys:
-            if "default" in kwargs:
-                return kwargs["default"]
-
-            raise KeyError(name)
-        elif self._keys[name]["type"] == "prefix":
-            if abs_key not in self._substores:
-                store = self.__class__(
-                    prefix=abs_key, region=self._region, ttl=self._ttl
-                )
-                store._keys = self._keys[name]["children"]
-                self._substores[abs_key] = store
-
-            return self._substores[abs_key]
-        else:
-            return self._get_value(name, abs_key)
+        substore = self._substores.get(abs_key, None)
+        if substore is not None:
+            return substore
+
+        value = self._get_value(name, abs_key)
+        if value is not None:
+            return value
+
+        if self._has_children(abs_key):
+            store = self.__class__(
+                prefix=abs_key,
+                region=self._region,
+                ttl=self._ttl,
+                maxsize=self._maxsize,
+            )
+            store._client = self._client
+            self._substores.put(abs_key, store)
+            return store
+
+        if "default" in kwargs:
+            return kwargs["default"]
+        raise KeyError(name)
+
+    def get_many(self, names: List[str]) -> KEYED:
+        """Fetch uncached values with batched get_parameters calls"""
+        values = {}
+        missing = []
+        for name in names:
+            value = self._values.get(name)
+            if value is TTLCache.MISSING:
+                missing.append(name)
+            else:
+                values[name] = value
+
+        for i in range(0, len(missing), self.BATCH_SIZE):
+            batch = {
+                "%s%s" % (self._prefix, name): name
+                for name in missing[i : i + self.BATCH_SIZE]
+            }
+            response = self._client.get_parameters(
+                Names=list(batch.keys()), WithDecryption=True
+            )
+            for parameter in response["Parameters"]:
+                name = batch[parameter["Name"]]
+                values[name] = self._cache_value(name, parameter)
+        return values
 
     def put(self, name: str, value: Any, **kwargs: Any) -> None:
         assert name, "Name can not be empty"
@@ -81,12 +166,48 @@ class SSMParameterStore(object):
             Name=abs_key, Value=value, Type="String", Overwrite=True
         )
 
-        if self._keys is not None:
-            self._keys[name] = {"type": "parameter", "value": value}
+        self._cache_value(name, {"Value": value, "Type": "String"})
+        with self._keys_lock:
+            if self._keys is not None:
+                self._update_keys(self._keys, name.split("/"))
+
+    def fetch(self, name: str) -> Optional[str]:
+        """Read one parameter directly, without listing the prefix"""
+        parameter = self._fetch_parameter("%s%s" % (self._prefix, name))
+        return None if parameter is None else str(parameter["Value"])
+
+    def fetch_many(self, names: List[str]) -> dict[str, str]:
+        """Read parameters directly, ten per request; absent names are omitted"""
+        values = {}
+        for i in range(0, len(names), self.BATCH_SIZE):
+            batch = {
+                "%s%s" % (self._prefix, name): name
+                for name in names[i : i + self.BATCH_SIZE]
+            }
+            response = self._client.get_parameters(
+                Names=list(batch.keys()), WithDecryption=True
+            )
+            for parameter in response["Parameters"]:
+                values[batch[parameter["Name"]]] = str(parameter["Value"])
+        return values
+
+    def load(self) -> KEYED:
+        """Cache every value under this prefix, ten per request"""
+        values = {}
+        paginator = self._client.get_paginator("get_parameters_by_path")
+        pager = paginator.paginate(
+            Path=self._prefix, Recursive=True, WithDecryption=True
+        )
+        for page in pager:
+            for parameter in page["Parameters"]:
+                name = parameter["Name"][len(self._prefix) :]
+                values[name] = self._cache_value(name, parameter)
+        return values
 
     def refresh(self) -> None:
-        self._keys = {}
-        self._substores = {}
+        keys: KEYED = {}
+        self._values.clear()
+        self._substores.clear()
 
         paginator = self._client.get_paginator("describe_parameters")
         pager = paginator.paginate(
@@ -98,54 +219,57 @@ class SSMParameterStore(object):
         for page in pager:
             for p in page["Parameters"]:
                 paths = p["Name"][len(self._prefix) :].split("/")
-                self._update_keys(self._keys, paths)
+                self._update_keys(keys, paths)
+        with self._keys_lock:
+            self._keys = keys
 
     @classmethod
     def _update_keys(cls, keys: KEYED, paths: List[str]) -> None:
-        name = paths[0]
+        for name in paths[:-1]:
+            entry = keys.setdefault(name, {"type": "prefix"})
+            keys = entry.setdefault("children", {})
+        keys.setdefault(paths[-1], {"type": "parameter"})
 
-        # this is a prefix
-        if len(paths) > 1:
-            if name not in keys:
-                keys[name] = {"type": "prefix", "children": {}}
-
-            cls._update_keys(keys[name]["children"], paths[1:])
-        else:
-            keys[name] = {"type": "parameter", "expire": None}
+    def stats(self) -> KEYED:
+        return self._values.stats()
 
     def keys(self) -> List[str]:
         if self._keys is None:
             self.refresh()
 
-        return list(self._keys.keys())
+        with self._keys_lock:
+            return list(self._keys.keys())  # type: ignore
 
-    def _get_value(self, name: str, abs_key: str) -> Any:
-        entry = self._keys[name]
-
-        # simple ttl
-        if self._ttl is False or (
-            "expire" in entry and entry["expire"] <= datetime.datetime.now()
-        ):
-            entry.pop("value", None)
-
-        if "value" not in entry:
-            parameter = self._client.get_parameter(Name=abs_key, WithDecryption=True)[
-                "Parameter"
-            ]
-            value = parameter["Value"]
-            if parameter["Type"] == "StringList":
-                value = value.split(",")
+    def _fetch_parameter(self, abs_key: str) -> Optional[KEYED]:
+        try:
+            response = self._client.get_parameter(Name=abs_key, WithDecryption=True)
+        except self._client.exceptions.ParameterNotFound:
+            return None
+        return dict(response["Parameter"])
+
+    def _has_children(self, abs_key: str) -> bool:
+        response = self._client.get_parameters_by_path(
+            Path=abs_key, Recursive=True, MaxResults=1
+        )
+        return bool(response["Parameters"])
 
-            entry["value"] = value
+    def _cache_value(self, name: str, parameter: KEYED) -> Any:
+        value = parameter["Value"]
+        if parameter["Type"] == "StringList":
+            value = value.split(",")
 
-            if self._ttl:
-                entry["expire"] = datetime.datetime.now() + datetime.timedelta(
-                    seconds=self._ttl
-                )
-            else:
-                entry["expire"] = None
+        self._values.put(name, value)
+        return value
 
-        return entry["value"]
+    def _get_value(self, name: str, abs_key: str) -> Any:
+        value = self._values.get(name)
+        if value is not TTLCache.MISSING:
+            return value
+
+        parameter = self._fetch_parameter(abs_key)
+        if parameter is None:
+            return None
+        return self._cache_value(name, parameter)
 
     def __contains__(self, name: str) -> bool:
         try:
@@ -0,0 +1,111 @@
+import json
+
+from pandas import DataFrame  # type: ignore
+from pathlib import Path
+from typing import Any, Optional
+
+from .recal_summary import RecalSummary
+from .types import KEYED
+
+VEGA_LITE = "https://vega.github.io/schema/vega-lite/v5.json"
+
+
+class SummaryAssets:
+    """
+    Small, pre-aggregated artifacts for the catalog landing page.
+
+    Collects capped row previews while the report streams, then writes
+    Vega-Lite specs with inline data drawn from a `RecalSummary`, so the
+    browser never has to fetch a full table.
+    """
+
+    @staticmethod
+    def Downsample(frame: DataFrame, max_points: int) -> DataFrame:
+        if len(frame) <= max_points:
+            return frame
+        step = -(-len(frame) // max_points)  # ceiling division
+        return frame.iloc[::step]
+
+    @staticmethod
+    def Spec(title: str, data: DataFrame, mark: str, encoding: KEYED) -> KEYED:
+        return {
+            "$schema": VEGA_LITE,
+            "title": title,
+            "width": "container",
+            "data": {"values": data.to_dict(orient="records")},
+            "mark": {"type": mark, "tooltip": True},
+            "encoding": encoding,
+        }
+
+    def __init__(self, preview_rows: int = 100, max_points: int = 500) -> None:
+        self.preview_rows = preview_rows
+        self.max_points = max_points
+        self.previews: dict[str, DataFrame] = {}
+        self.by_quality: Optional[DataFrame] = None
+
+    def add(self, name: str, table: DataFrame) -> None:
+        self.previews[name] = table.head(self.preview_rows)
+        if name == "RecalTable1":
+            self.by_quality = table[
+                ["ReadGroup", "EventType", "QualityScore", "EmpiricalQuality"]
+            ]
+
+    def specs(self, summary: RecalSummary) -> dict[str, KEYED]:
+        specs = {}
+        if self.by_quality is not None:
+            data = self.Downsample(self.by_quality, self.max_points)
+            specs["recal_by_quality"] = self.Spec(
+                "Empirical vs reported quality",
+                data,
+                "line",
+                {
+                    "x": {"field": "QualityScore", "type": "quantitative"},
+                    "y": {"field": "EmpiricalQuality", "type": "quantitative"},
+                    "color": {"field": "ReadGroup", "type": "nominal"},
+                },
+            )
+        if summary.covariates is not None:
+            covariates = summary.covariates
+            columns = ["ReadGroup", "CovariateValue", "EventType", "Delta"]
+            cycle = covariates[covariates["CovariateName"] == "Cycle"][columns]
+            cycle = cycle.assign(Cycle=cycle["CovariateValue"].astype(int))
+            cycle = cycle.drop(columns="CovariateValue").sort_values("Cycle")
+            specs["recal_by_cycle"] = self.Spec(
+                "Quality delta by cycle",
+                self.Downsample(cycle, self.max_points),
+                "line",
+                {
+                    "x": {"field": "Cycle", "type": "quantitative"},
+                    "y": {"field": "Delta", "type": "quantitative"},
+                    "color": {"field": "EventType", "type": "nominal"},
+                },
+            )
+            context = covariates[covariates["CovariateName"] == "Context"][columns]
+            specs["recal_by_context"] = self.Spec(
+                "Quality delta by context",
+                self.Downsample(context, self.max_points),
+                "bar",
+                {
+                    "x": {"field": "CovariateValue", "type": "nominal"},
+                    "y": {"field": "Delta", "type": "quantitative"},
+                    "color": {"field": "EventType", "type": "nominal"},
+                },
+            )
+        return specs
+
+    def write(self, root: Path, summary: RecalSummary) -> KEYED:
+        """Write specs and previews, returning summarize entries by file name"""
+        entries: KEYED = {}
+        for name, spec in self.specs(summary).items():
+            dest = root / f"{name}.vl.json"
+            dest.write_text(json.dumps(spec, default=float))
+            entries[dest.name] = self.Entry(dest, spec["title"])
+        for name, preview in self.previews.items():
+            dest = root / f"{name}.preview.csv"
+            preview.to_csv(dest)
+            entries[dest.name] = self.Entry(dest, f"{name} (first rows)")
+        return entries
+
+    @staticmethod
+    def Entry(dest: Path, title: str) -> Any:
+        return {"path": str(dest), "title": title}
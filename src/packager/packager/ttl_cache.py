@@ -0,0 +1,73 @@
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .types import KEYED
+
+
+class TTLCache:
+    """
+    Size-limited LRU cache whose entries expire `ttl` seconds after insertion.
+
+    `ttl=None` keeps entries until evicted; `ttl=0` disables caching.
+    """
+
+    MISSING = object()
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[str, tuple[Any, Optional[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expire = item
+                if expire is None or expire > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: str, value: Any) -> None:
+        if self.ttl == 0 or self.maxsize <= 0:
+            return
+        expire = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (value, expire)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> KEYED:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not self.MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import io
+
+from botocore.exceptions import ClientError  # type: ignore
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Iterator
+
+
+class FakeS3Paginator:
+    def __init__(self, client: "FakeS3Client", operation: str) -> None:
+        self.client = client
+        self.operation = operation
+
+    def paginate(self, Bucket: str, Prefix: str = "", **kwargs: Any) -> Iterator[dict]:
+        keys = sorted(k for k in self.client.objects if k.startswith(Prefix))
+        for start in range(0, max(len(keys), 1), self.client.PAGE_SIZE):
+            self.client.calls[self.operation] += 1
+            page = [
+                self.client._object(k) for k in keys[start:][: self.client.PAGE_SIZE]
+            ]
+            if self.operation == "list_object_versions":
+                yield {"Versions": [{**o, "IsLatest": True} for o in page]}
+            else:
+                yield {"Contents": page}
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client, counting API calls"""
+
+    PAGE_SIZE = 1000
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.part_sizes: dict[str, int] = {}
+        self.calls: Counter = Counter()
+
+    def put_object(
+        self,
+        Bucket: str,
+        Key: str,
+        Body: Any = b"",
+        PartSize: int = 0,
+        **kwargs: Any,
+    ) -> dict:
+        """PartSize simulates a multipart upload with SHA-256 checksums"""
+        self.calls["put_object"] += 1
+        if_match = kwargs.get("IfMatch")
+        exists = Key in self.objects
+        if (kwargs.get("IfNoneMatch") == "*" and exists) or (
+            if_match and (not exists or if_match != self._object(Key)["ETag"])
+        ):
+            error = {"Error": {"Code": "PreconditionFailed", "Message": Key}}
+            raise ClientError(error, "PutObject")
+        body = Body.read() if hasattr(Body, "read") else Body
+        self.objects[Key] = body
+        if PartSize:
+            self.part_sizes[Key] = PartSize
+        return {"ChecksumSHA256": self._sha256(body), "VersionId": f"v-{len(Key)}"}
+
+    def get_object_attributes(
+        self,
+        Bucket: str,
+        Key: str,
+        MaxParts: int = 1000,
+        PartNumberMarker: int = 0,
+        **kwargs: Any,
+    ) -> dict:
+        self.calls["get_object_attributes"] += 1
+        body = self.objects[Key]
+        response: dict = {"ObjectSize": len(body)}
+        size = self.part_sizes.get(Key)
+        if not size:
+            response["Checksum"] = {"ChecksumSHA256": self._sha256(body)}
+            return response
+        parts = [
+            {
+                "PartNumber": i + 1,
+                "Size": len(chunk),
+                "ChecksumSHA256": self._sha256(chunk),
+            }
+            for i, chunk in enumerate(
+                body[start : start + size] for start in range(0, len(body), size)
+            )
+        ]
+        page = parts[PartNumberMarker : PartNumberMarker + MaxParts]
+        truncated = PartNumberMarker + MaxParts < len(parts)
+        response["ObjectParts"] = {
+            "TotalPartsCount": len(parts),
+            "Parts": page,
+            "IsTruncated": truncated,
+            "NextPartNumberMarker": PartNumberMarker + len(page),
+        }
+        return response
+
+    def get_object(self, Bucket: str, Key: str, Range: str = "", **kwargs: Any) -> dict:
+        self.calls["get_object"] += 1
+        body = self._body(Key, "GetObject")
+        if Range:
+            start, end = Range.removeprefix("bytes=").split("-")
+            body = body[int(start) : int(end) + 1]
+        return {
+            "Body": io.BytesIO(body),
+            "ContentLength": len(body),
+            "ETag": self._object(Key)["ETag"],
+        }
+
+    def head_object(self, Bucket: str, Key: str, **kwargs: Any) -> dict:
+        self.calls["head_object"] += 1
+        self._body(Key, "HeadObject")
+        obj = self._object(Key)
+        return {
+            "ContentLength": obj["Size"],
+            "ETag": obj["ETag"],
+            "LastModified": obj["LastModified"],
+            "VersionId": obj["VersionId"],
+        }
+
+    def get_paginator(self, operation: str) -> FakeS3Paginator:
+        return FakeS3Paginator(self, operation)
+
+    def _body(self, key: str, operation: str) -> bytes:
+        if key not in self.objects:
+            error = {"Error": {"Code": "NoSuchKey", "Message": key}}
+            raise ClientError(error, operation)
+        return self.objects[key]
+
+    @staticmethod
+    def _sha256(data: bytes) -> str:
+        return base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+    def _object(self, key: str) -> dict:
+        return {
+            "Key": key,
+            "Size": len(self.objects[key]),
+            "ETag": f'"{abs(hash(self.objects[key])):032x}"',
+            "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc),
+            "VersionId": f"v-{len(key)}",
+        }
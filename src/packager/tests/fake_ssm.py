@@ -0,0 +1,77 @@
+from collections import Counter
+from typing import Any, Iterator
+
+
+class ParameterNotFound(Exception):
+    pass
+
+
+class FakePaginator:
+    def __init__(self, method: Any, size: int) -> None:
+        self.method = method
+        self.size = size
+
+    def paginate(self, **kwargs: Any) -> Iterator[dict]:
+        token = 0
+        while token is not None:
+            page = self.method(MaxResults=self.size, NextToken=token, **kwargs)
+            token = page.get("NextToken")
+            yield page
+
+
+class FakeSSMClient:
+    """In-memory stand-in for the boto3 SSM client, counting API calls"""
+
+    class exceptions:
+        ParameterNotFound = ParameterNotFound
+
+    def __init__(self) -> None:
+        self.parameters: dict[str, str] = {}
+        self.calls: Counter = Counter()
+
+    def put_parameter(self, Name: str, Value: str, **kwargs: Any) -> None:
+        self.calls["put_parameter"] += 1
+        self.parameters[Name] = Value
+
+    def get_parameter(self, Name: str, **kwargs: Any) -> dict:
+        self.calls["get_parameter"] += 1
+        if Name not in self.parameters:
+            raise ParameterNotFound(Name)
+        return {"Parameter": self._parameter(Name)}
+
+    def get_parameters(self, Names: list[str], **kwargs: Any) -> dict:
+        self.calls["get_parameters"] += 1
+        assert len(Names) <= 10
+        found = [self._parameter(n) for n in Names if n in self.parameters]
+        return {"Parameters": found}
+
+    def get_parameters_by_path(
+        self, Path: str, MaxResults: int = 10, NextToken: int = 0, **kwargs: Any
+    ) -> dict:
+        self.calls["get_parameters_by_path"] += 1
+        return self._page(Path, MaxResults, NextToken, self._parameter)
+
+    def describe_parameters(
+        self,
+        ParameterFilters: list[dict],
+        MaxResults: int = 50,
+        NextToken: int = 0,
+    ) -> dict:
+        self.calls["describe_parameters"] += 1
+        path = ParameterFilters[0]["Values"][0]
+        return self._page(path, MaxResults, NextToken, lambda n: {"Name": n})
+
+    def get_paginator(self, operation: str) -> FakePaginator:
+        size = 50 if operation == "describe_parameters" else 10
+        return FakePaginator(getattr(self, operation), size)
+
+    def _parameter(self, name: str) -> dict:
+        return {"Name": name, "Value": self.parameters[name], "Type": "String"}
+
+    def _page(self, path: str, size: int, token: int, render: Any) -> dict:
+        path = path.rstrip("/") + "/"
+        names = sorted(n for n in self.parameters if n.startswith(path))
+        page: dict = {"Parameters": [render(n) for n in names[token : token + size]]}
+        if token + size < len(names):
+            page["NextToken"] = token + size
+        return page
@@ -0,0 +1,135 @@
+import random
+
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+CONTEXT_BASES = "ACGT"
+
+
+def format_table(
+    name: str,
+    columns: Sequence[str],
+    formats: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+) -> str:
+    """Render one fixed-width GATKTable, right-aligning numeric columns"""
+    cells = [[fmt % value for fmt, value in zip(formats, row)] for row in rows]
+    widths = [
+        max([len(column)] + [len(row[i]) for row in cells])
+        for i, column in enumerate(columns)
+    ]
+    numeric = [fmt != "%s" for fmt in formats]
+
+    def render(values: Sequence[str], header: bool = False) -> str:
+        padded = [
+            value.rjust(width) if right and not header else value.ljust(width)
+            for value, width, right in zip(values, widths, numeric)
+        ]
+        return "  ".join(padded)
+
+    lines = [
+        f"#:GATKTable:{len(columns)}:{len(cells)}:{':'.join(formats)}:;",
+        f"#:GATKTable:{name}:",
+        render(columns, header=True),
+        *(render(row) for row in cells),
+    ]
+    return "\n".join(lines) + "\n\n"
+
+
+def write_report(
+    path: Path,
+    read_groups: int = 2,
+    qualities: int = 40,
+    cycles: int = 150,
+    context_size: int = 2,
+    seed: int = 0,
+) -> Path:
+    """A synthetic BQSR report with the same five tables GATK writes"""
+    rng = random.Random(seed)
+    groups = [f"Sample_{i:03d}" for i in range(read_groups)]
+    scores = range(2, 2 + qualities)
+    contexts = [""]
+    for _ in range(context_size):
+        contexts = [c + b for c in contexts for b in CONTEXT_BASES]
+    covariates = [("Cycle", str(c)) for c in range(-cycles, cycles + 1) if c] + [
+        ("Context", c) for c in contexts
+    ]
+
+    def counts() -> tuple[int, float]:
+        observations = rng.randint(1, 10_000_000)
+        return observations, round(observations * rng.random() * 0.01, 2)
+
+    parts = ["#:GATKReport.v1.1:5\n"]
+    parts.append(
+        format_table(
+            "Arguments",
+            ["Argument", "Value"],
+            ["%s", "%s"],
+            [("covariate", "ReadGroupCovariate,QualityScoreCovariate")],
+        )
+    )
+    parts.append(
+        format_table(
+            "Quantized",
+            ["QualityScore", "Count", "QuantizedScore"],
+            ["%d", "%d", "%d"],
+            [(q, rng.randint(0, 1000), q // 8 * 8) for q in range(94)],
+        )
+    )
+    parts.append(
+        format_table(
+            "RecalTable0",
+            ["ReadGroup", "EventType", "EmpiricalQuality", "EstimatedQReported"]
+            + ["Observations", "Errors"],
+            ["%s", "%s", "%.4f", "%.4f", "%d", "%.2f"],
+            [(g, "M", 26.0, 25.5, *counts()) for g in groups],
+        )
+    )
+    parts.append(
+        format_table(
+            "RecalTable1",
+            ["ReadGroup", "QualityScore", "EventType", "EmpiricalQuality"]
+            + ["Observations", "Errors"],
+            ["%s", "%d", "%s", "%.4f", "%d", "%.2f"],
+            [
+                (g, q, "M", q + rng.uniform(-3, 3), *counts())
+                for g in groups
+                for q in scores
+            ],
+        )
+    )
+    parts.append(
+        format_table(
+            "RecalTable2",
+            ["ReadGroup", "QualityScore", "CovariateValue", "CovariateName"]
+            + ["EventType", "EmpiricalQuality", "Observations", "Errors"],
+            ["%s", "%d", "%s", "%s", "%s", "%.4f", "%d", "%.2f"],
+            [
+                (g, q, value, name, "M", q + rng.uniform(-3, 3), *counts())
+                for g in groups
+                for q in scores
+                for name, value in covariates
+            ],
+        )
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(parts))
+    return path
+
+
+def write_run(root: Path, files: int = 100, size: int = 1024, **report: Any) -> Path:
+    """A local run folder: a BQSR report plus `files` outputs of `size` bytes"""
+    write_report(root / "out" / "bqsr_report" / "SYN.hg38.recal_data.csv", **report)
+    for i in range(files):
+        path = root / "out" / f"shard-{i // 100:03d}" / f"part-{i:05d}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(bytes([i % 256]) * size)
+    return root
+
+
+def s3_run(client: Any, prefix: str, files: int = 1000, size: int = 1024) -> str:
+    """Populate a FakeS3Client with a run folder; returns its S3 URI"""
+    for i in range(files):
+        key = f"{prefix}/out/shard-{i // 100:03d}/part-{i:05d}.bin"
+        client.objects[key] = bytes([i % 256]) * size
+    return f"s3://bucket/{prefix}"
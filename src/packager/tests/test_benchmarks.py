@@ -0,0 +1,215 @@
+"""
+Pipeline benchmarks over synthetic reports and run folders.
+
+Marked `benchmark`, so the default run deselects them; `make bench` runs
+them with `-m benchmark`. S3 is an in-memory stand-in: `FakeS3Client` for
+the boto3 clients quilt3 pushes through, and fsspec's memory filesystem
+for report downloads.
+
+Scale with BENCH_SCALE (default 1). Set BENCH_OUTPUT to save the results
+as JSON, and BENCH_BASELINE to a saved file to fail on regressions beyond
+BENCH_TOLERANCE (default 0.5, i.e. 50% slower or larger).
+"""
+
+import json
+import math
+import os
+import pytest
+import resource
+import time
+import tracemalloc
+
+from packager import Constants, GatkReportStream, GSAHandler
+from packager.recal_summary import RecalSummary
+from packager.run_manifest import RunManifest
+from packager.s3_checksums import S3Checksums
+from pathlib import Path
+from upath import UPath
+from quilt3.data_transfer import S3ClientProvider  # type: ignore
+from typing import Any, Callable, Optional
+from .fake_s3 import FakeS3Client
+from .synthetic import s3_run, write_report, write_run
+
+SCALE = int(os.environ.get("BENCH_SCALE", "1"))
+TOLERANCE = float(os.environ.get("BENCH_TOLERANCE", "0.5"))
+REPORT = {"read_groups": 2 * SCALE, "cycles": 150, "qualities": 40}
+OPTS = {"uri": "s3://bucket/omics-quilt/bench", "package": "omics-quilt/bench"}
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.results: dict[str, dict] = {}
+        baseline = os.environ.get("BENCH_BASELINE")
+        self.baseline = json.loads(Path(baseline).read_text()) if baseline else {}
+
+    def measure(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        calls: Optional[dict] = None,
+        **params: Any,
+    ) -> Any:
+        """Time one run, then trace a second for peak Python allocations"""
+        start = time.perf_counter()
+        value = fn()
+        seconds = time.perf_counter() - start
+        before = dict(calls or {})
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        requests = {k: v - before.get(k, 0) for k, v in (calls or {}).items()}
+        result = {
+            "seconds": round(seconds, 4),
+            "peak_bytes": peak,
+            "max_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+            "requests": {k: v for k, v in requests.items() if v},
+            "scale": SCALE,
+            **params,
+        }
+        self.results[name] = result
+        self.check(name, result)
+        return value
+
+    def check(self, name: str, result: dict) -> None:
+        base = self.baseline.get(name)
+        if base is None or base.get("scale") != result["scale"]:
+            return
+        limit = 1 + TOLERANCE
+        assert result["seconds"] <= base["seconds"] * limit, f"{name} slower"
+        assert result["peak_bytes"] <= base["peak_bytes"] * limit, f"{name} larger"
+        for op, count in result["requests"].items():
+            assert count <= base["requests"].get(op, 0), f"{name} more {op} calls"
+
+
+@pytest.fixture(scope="module")
+def bench():
+    recorder = Recorder()
+    yield recorder
+    for name, result in recorder.results.items():
+        print(f"\nbench {name}: {result}")
+    output = os.environ.get("BENCH_OUTPUT")
+    if output:
+        Path(output).write_text(json.dumps(recorder.results, indent=2))
+
+
+@pytest.fixture(scope="module")
+def run(tmp_path_factory):
+    root = tmp_path_factory.mktemp("bench") / "run"
+    return write_run(root, files=100 * SCALE, size=4096, **REPORT)
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """Serve every quilt3 and packager S3 call from one in-memory client"""
+    client = FakeS3Client()
+    monkeypatch.setattr(S3ClientProvider, "standard_client", property(lambda _: client))
+    monkeypatch.setattr(S3ClientProvider, "find_correct_client", lambda *_: client)
+    monkeypatch.setattr(RunManifest, "Client", lambda *_: client)
+    monkeypatch.setattr(S3Checksums, "Client", lambda *_: client)
+    return client
+
+
+@pytest.fixture
+def memory_s3(monkeypatch):
+    """Resolve s3:// URIs to fsspec's in-memory filesystem"""
+    to_path = Constants.ToPath.__func__
+
+    def memory(cls: type, uri: str) -> Path:
+        if uri.startswith("s3://"):
+            return UPath(uri.replace("s3://", "memory://", 1))
+        return to_path(cls, uri)
+
+    monkeypatch.setattr(Constants, "ToPath", classmethod(memory))
+    yield
+    UPath("memory://bucket").fs.rm("/bucket", recursive=True)
+
+
+@pytest.mark.benchmark
+def test_download_report(bench, run):
+    report = run / "out" / "bqsr_report" / "SYN.hg38.recal_data.csv"
+    handler = GSAHandler({"TABLE_FORMAT": "csv,parquet"})
+    tables = bench.measure(
+        "downloadReport",
+        lambda: handler.downloadReport(str(report), run, [RecalSummary()]),
+        report_bytes=report.stat().st_size,
+    )
+    assert len(tables) == 10
+
+
+@pytest.mark.benchmark
+def test_download_report_s3(bench, run, memory_s3):
+    local = run / "out" / "bqsr_report" / "SYN.hg38.recal_data.csv"
+    report_uri = f"{OPTS['uri']}/out/bqsr_report/{local.name}"
+    Constants.ToPath(report_uri).write_bytes(local.read_bytes())
+    handler = GSAHandler({"TABLE_FORMAT": "csv,parquet"})
+    tables = bench.measure(
+        "downloadReport.s3",
+        lambda: handler.downloadReport(report_uri, Path(), [RecalSummary()]),
+        report_bytes=local.stat().st_size,
+    )
+    assert len(tables) == 10
+    assert all(UPath(uri).exists() for uri in tables.values())
+
+
+@pytest.mark.benchmark
+def test_download_tables(bench, run, tmp_path):
+    report = run / "out" / "bqsr_report" / "SYN.hg38.recal_data.csv"
+    parsed = list(GatkReportStream(report))
+    handler = GSAHandler({"TABLE_FORMAT": "csv,parquet"})
+    rows = sum(len(table) for _, table in parsed)
+    tables = bench.measure(
+        "downloadTables",
+        lambda: handler.downloadTables(iter(parsed), tmp_path),
+        rows=rows,
+    )
+    assert len(tables) == 10
+
+
+@pytest.mark.benchmark
+def test_package_local(bench, run, s3):
+    handler = GSAHandler({})
+
+    def package() -> Any:
+        manifest = handler.runManifest(run).load()
+        return handler.pushFolder(run, OPTS, {}, None, manifest)
+
+    meta = bench.measure("packageFolder.local", package, s3.calls, files=100 * SCALE)
+    assert meta["delta"]["added"]
+    assert f".quilt/packages/{meta['top_hash']}" in s3.objects
+    requests = bench.results["packageFolder.local"]["requests"]
+    uploads = sum(1 for path in run.rglob("*") if path.is_file())
+    assert requests["put_object"] == uploads + 3
+
+
+@pytest.mark.benchmark
+def test_package_s3(bench, s3):
+    files = 1000 * SCALE
+    uri = s3_run(s3, "omics-quilt/bench", files=files, size=4096)
+    handler = GSAHandler({})
+
+    def package() -> Any:
+        manifest = handler.runManifest(Constants.ToPath(uri)).load()
+        return handler.pushFolder(Path(), OPTS, {}, None, manifest)
+
+    meta = bench.measure("packageFolder.s3", package, s3.calls, files=files)
+    assert meta["checksums"]["reused"] == files
+    requests = bench.results["packageFolder.s3"]["requests"]
+    assert requests == {
+        "list_object_versions": math.ceil(files / FakeS3Client.PAGE_SIZE),
+        "get_object_attributes": files,
+        # workflow config lookup, then manifest and two pointers
+        "get_object": 1,
+        "put_object": 3,
+        # push shortens the top hash for its summary line
+        "list_objects_v2": 1,
+    }
+
+
+def test_synthetic_report(tmp_path):
+    path = write_report(tmp_path / "r.csv", read_groups=1, qualities=2, cycles=1)
+    tables = dict(GatkReportStream(path))
+    assert len(tables["RecalTable2"]) == 2 * (2 + 16)
+    assert list(tables["RecalTable0"]["ReadGroup"]) == ["Sample_000"]
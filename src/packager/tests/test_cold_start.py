@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+
+from pathlib import Path
+
+HEAVY = ["pandas", "numpy", "pyarrow", "quilt3", "upath", "s3fs", "gsalib", "boto3"]
+BUDGET_US = int(os.environ.get("COLD_START_BUDGET_US") or 1_000_000)
+ROOT = Path(__file__).parent.parent
+
+
+def run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def loaded(code: str) -> list[str]:
+    script = f"{code}\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))"
+    modules = json.loads(run(script).stdout.splitlines()[-1])
+    return [name for name in HEAVY if name in modules]
+
+
+def test_import_is_light():
+    assert loaded("import packager.index") == []
+    assert loaded("import packager") == []
+
+
+def test_lazy_exports():
+    assert "pandas" in loaded("from packager import RecalIndex")
+
+
+def test_debounced_event_is_light(tmp_path):
+    code = f"""
+import os
+from packager import Constants, handler
+from tests.conftest import CTX
+
+os.environ["DEDUPE_BACKEND"] = "sqlite"
+os.environ["DEDUPE_PATH"] = {str(tmp_path / "dedupe.sqlite")!r}
+event = Constants.LoadObjectUri(CTX["EVENT"])
+event["detail-type"] = None
+event.pop("debug", None)
+assert handler(event, CTX)["statusCode"] == 400
+assert handler(event, CTX)["body"]["message"] == "Not ready"
+"""
+    assert loaded(code) == []
+
+
+def test_import_time_budget():
+    stderr = run("import packager.index", "-X", "importtime").stderr
+    cumulative = [
+        int(line.split("|")[1])
+        for line in stderr.splitlines()
+        if line.rstrip().endswith(" packager.index")
+    ]
+    assert cumulative and cumulative[-1] < BUDGET_US
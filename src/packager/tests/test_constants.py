@@ -1,5 +1,7 @@
 from packager import Constants
 from .conftest import CTX
+from pathlib import Path
+from upath import UPath
 import pytest
 import time
 
@@ -14,6 +16,14 @@ def test_constants(cc):
     assert "packager" in cc.get("APP_NAME")
 
 
+def test_flag():
+    cc = Constants({"ON": "True", "YES": "yes", "OFF": "0", "EMPTY": ""})
+    assert cc.flag("ON") and cc.flag("YES")
+    assert not cc.flag("OFF")
+    assert not cc.flag("EMPTY") and not cc.flag("MISSING")
+    assert cc.flag("EMPTY", "true") and not cc.flag("OFF", "true")
+
+
 def test_download_object(cc):
     assert cc
     for filename in cc.DownloadURI(CTX["META"]):
@@ -23,6 +33,31 @@ def test_download_object(cc):
         assert filename.is_file()
 
 
+def test_download_streams(cc, monkeypatch):
+    source = Path(CTX["REPORT"]).absolute()
+    monkeypatch.setattr(Constants, "ToPath", lambda uri: UPath(f"file://{uri}"))
+    monkeypatch.setattr(Constants, "CHUNK_SIZE", 4096)
+    for filename in cc.DownloadURI(str(source)):
+        assert filename != source
+        assert filename.read_bytes() == source.read_bytes()
+    assert not filename.exists()
+
+
+def test_warm_reuse(cc, monkeypatch):
+    warm = Constants(CTX)
+    assert warm.ssm is cc.ssm
+    assert warm.ssm._client is Constants({}).ssm._client
+    warm.put("TABLE_FORMAT", "parquet")
+    assert not Constants(CTX).has("TABLE_FORMAT")
+    monkeypatch.setenv("TABLE_FORMAT", "parquet")
+    assert Constants(CTX).get("TABLE_FORMAT") == "parquet"
+
+
+def test_clear_cache(cc):
+    Constants.ClearCache()
+    assert Constants(CTX).ssm is not cc.ssm
+
+
 def test_check_time(cc):
     key = "timer"
     assert cc.check_time(key)
@@ -0,0 +1,84 @@
+import pytest
+
+from packager import Constants
+from packager.dedupe_store import DedupeStore, SqliteDedupeBackend
+from .conftest import CTX
+
+
+class CountingBackend(SqliteDedupeBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.reads = 0
+        self.writes: list[dict[str, int]] = []
+
+    def get(self, key):
+        self.reads += 1
+        return super().get(key)
+
+    def put_many(self, items):
+        self.writes.append(dict(items))
+        super().put_many(items)
+
+
+@pytest.fixture
+def backend():
+    return CountingBackend()
+
+
+@pytest.fixture
+def store(backend):
+    return DedupeStore(backend, ttl=10, maxsize=2)
+
+
+def test_check(store, backend):
+    assert store.check("run/1", 100)
+    assert not store.check("run/1", 105)
+    assert store.check("run/1", 110)
+    assert backend.reads == 2
+    assert backend.get("run/1") == 110
+
+
+def test_persisted(store, backend):
+    assert store.check("run/1", 100)
+    fresh = DedupeStore(backend, ttl=10)
+    assert not fresh.check("run/1", 105)
+
+
+def test_lru(store, backend):
+    for key in ["a", "b", "c"]:
+        store.check(key, 100)
+    reads = backend.reads
+    assert not store.check("a", 101)
+    assert backend.reads == reads + 1
+
+
+def test_expired_rereads(backend):
+    a = DedupeStore(backend, ttl=10)
+    b = DedupeStore(backend, ttl=10)
+    assert a.check("run/1", 100)
+    assert b.check("run/1", 111)
+    assert not a.check("run/1", 112)
+
+
+def test_constants_backend(monkeypatch):
+    monkeypatch.setenv("DEDUPE_BACKEND", "sqlite")
+    monkeypatch.setenv("DEDUPE_PATH", ":memory:")
+    cc = Constants(CTX)
+    assert cc.dedupe_store() is Constants(CTX).dedupe_store()
+    assert cc.check_time("s3://bucket/run")
+    assert not cc.check_time("s3://bucket/run")
+    monkeypatch.setenv("DEDUPE_BACKEND", "dynamo")
+    with pytest.raises(ValueError):
+        Constants(CTX).dedupe_store()
+
+
+def test_prefetch(store, backend):
+    backend.put_many({"a": 100})
+    with store.prefetch(["a", "b", "a"]):
+        assert not store.check("a", 105)
+        assert store.check("b", 105)
+        assert backend.writes[-1] == {"b": 105}
+        assert not store.check("b", 106)
+    assert backend.reads == 0
+    assert store.check("c", 105)
+    assert backend.reads == 1
@@ -0,0 +1,102 @@
+import gzip
+import pytest
+import shutil
+
+from packager import Extractor, ExtractorRegistry, GSAHandler
+from packager.extractors import FastqExtractor, VepExtractor
+from packager.run_manifest import RunManifest
+from pathlib import Path
+from .conftest import CTX
+
+VEP_TAB = """## ENSEMBL VARIANT EFFECT PREDICTOR v106.1
+#Uploaded_variation\tLocation\tAllele\tGene\tFeature\tFeature_type\tConsequence\tExtra
+rs1\t1:100\tA\tG1\tT1\tTranscript\tmissense_variant\tIMPACT=MODERATE;STRAND=1
+rs1\t1:100\tA\tG1\tT2\tTranscript\tsplice_region_variant,intron_variant\tIMPACT=LOW
+rs2\t1:200\tT\tG2\tT3\tTranscript\tstop_gained\tIMPACT=HIGH
+"""
+
+VEP_VCF = """##fileformat=VCFv4.2
+##INFO=<ID=CSQ,Number=.,Type=String,Description="Consequence annotations from Ensembl VEP. Format: Allele|Consequence|IMPACT|SYMBOL">
+#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO
+1\t100\trs1\tG\tA\t.\tPASS\tCSQ=A|missense_variant|MODERATE|G1,A|intron_variant&splice_region_variant|LOW|G1
+1\t200\trs2\tC\tT\t.\tPASS\tDP=10;CSQ=T|stop_gained|HIGH|G2
+"""
+
+FASTQ = "@r1\nACGT\n+\nIIII\n@r2\nGGCCAA\n+\n!!!!!!\n"
+
+
+@pytest.fixture
+def run(tmp_path):
+    shutil.copytree(Path(CTX["REPORT"]).parent.parent.parent, tmp_path / "run")
+    run = tmp_path / "run"
+    (run / "out" / "vep").mkdir()
+    (run / "out" / "vep" / "S1.ann.tab").write_text(VEP_TAB)
+    (run / "out" / "vep" / "S1.ann.vcf").write_text(VEP_VCF)
+    with gzip.open(run / "out" / "S1_R1.fastq.gz", "wt") as fh:
+        fh.write(FASTQ)
+    return run
+
+
+def test_select(run):
+    keys = RunManifest(str(run)).load().keys()
+    assert "out/bqsr_report/NA12878.hg38.recal_data.csv" in keys
+    selected = ExtractorRegistry.Default().select(keys)
+    matched = {extractor.NAME: found for extractor, found in selected}
+    assert matched == {
+        "recal": ["out/bqsr_report/NA12878.hg38.recal_data.csv"],
+        "vep": ["out/vep/S1.ann.tab", "out/vep/S1.ann.vcf"],
+        "fastq": ["out/S1_R1.fastq.gz"],
+    }
+    assert ExtractorRegistry.Default().select(["params.json"]) == []
+
+
+def test_vep_formats(run):
+    with open(run / "out" / "vep" / "S1.ann.tab") as fh:
+        tab = VepExtractor.CountTab(fh)
+    with open(run / "out" / "vep" / "S1.ann.vcf") as fh:
+        vcf = VepExtractor.CountVcf(fh)
+    assert tab == vcf
+    assert tab["variants"] == 2
+    assert tab["IMPACT"] == {"MODERATE": 1, "LOW": 1, "HIGH": 1}
+    assert tab["Consequence"]["splice_region_variant"] == 1
+    assert not tab["sampled"]
+    with open(run / "out" / "vep" / "S1.ann.tab") as fh:
+        tab = VepExtractor.CountTab(fh, max_variants=1)
+    with open(run / "out" / "vep" / "S1.ann.vcf") as fh:
+        vcf = VepExtractor.CountVcf(fh, max_variants=1)
+    assert tab == vcf
+    assert tab["variants"] == 1 and tab["sampled"]
+    assert tab["IMPACT"] == {"MODERATE": 1, "LOW": 1}
+
+
+def test_fastq_stats(run):
+    handler = GSAHandler({})
+    result = FastqExtractor().extract(handler, run, ["out/S1_R1.fastq.gz"])
+    stats = result["meta"]["out/S1_R1.fastq.gz"]
+    assert stats["reads"] == 2
+    assert stats["bases"] == 10
+    assert stats["gc_fraction"] == 0.6
+    assert stats["mean_quality"] == 16.0
+    assert not stats["sampled"]
+    assert (run / "fastq_stats.csv").exists()
+    handler.cc.put("FASTQ_MAX_READS", "1")
+    result = FastqExtractor().extract(handler, run, ["out/S1_R1.fastq.gz"])
+    assert result["meta"]["out/S1_R1.fastq.gz"]["sampled"]
+
+
+def test_vep_extract(run):
+    result = VepExtractor().extract(GSAHandler({}), run, ["out/vep/S1.ann.tab"])
+    assert result["meta"]["S1"]["variants"] == 2
+    assert (run / "out" / "vep" / "S1.vep_summary.csv").exists()
+    handler = GSAHandler({})
+    handler.cc.put("VEP_MAX_VARIANTS", "1")
+    result = VepExtractor().extract(handler, run, ["out/vep/S1.ann.tab"])
+    assert result["meta"]["S1"]["sampled"]
+
+
+def test_abstract():
+    class Incomplete(Extractor):
+        NAME = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
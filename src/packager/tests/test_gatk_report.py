@@ -0,0 +1,71 @@
+import pytest
+import tracemalloc
+
+from gsalib import GatkReport  # type: ignore
+from io import StringIO
+from packager import GatkReportStream
+from pathlib import Path
+from .conftest import CTX
+
+OUT_DIR = Path(CTX["REPORT"]).parent.parent
+
+
+@pytest.fixture
+def report():
+    return GatkReportStream(Path(CTX["REPORT"]))
+
+
+def peak_memory(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_stream_tables(report):
+    names = [name for name, _ in report]
+    assert names == [
+        "Arguments",
+        "Quantized",
+        "RecalTable0",
+        "RecalTable1",
+        "RecalTable2",
+    ]
+    assert report.version == "1.1"
+    assert report.n_tables == 5
+
+
+def test_stream_matches_fixtures(report, tmp_path):
+    for name, table in report:
+        dest = tmp_path / f"{name}.csv"
+        table.to_csv(dest)
+        assert dest.read_text() == (OUT_DIR / f"{name}.csv").read_text()
+
+
+def test_stream_is_lazy(report):
+    tables = iter(report)
+    name, table = next(tables)
+    assert name == "Arguments"
+    assert len(table) == 17
+
+
+def test_bad_header():
+    stream = GatkReportStream(Path(CTX["REPORT"]))
+    with pytest.raises(ValueError):
+        list(stream.read(StringIO("not a report\n")))
+
+
+def test_benchmark_peak_memory(report):
+    def streamed():
+        for name, table in report:
+            del table
+
+    def buffered():
+        GatkReport(CTX["REPORT"])
+
+    stream_peak = peak_memory(streamed)
+    gsalib_peak = peak_memory(buffered)
+    print(f"peak bytes: stream={stream_peak} gsalib={gsalib_peak}")
+    assert stream_peak < gsalib_peak
@@ -1,9 +1,15 @@
+import asyncio
 import json
 import os
+import pandas as pd
 import pytest
+import shutil
 from datetime import datetime
 
 from packager import GSAHandler
+from packager.package_delta import PackageDelta
+from quilt3 import data_transfer  # type: ignore
+from quilt3.util import PhysicalKey  # type: ignore
 from tempfile import TemporaryDirectory
 
 # from unittest.mock import MagicMock, patch
@@ -85,3 +91,92 @@ def test_package_folder(handler, root):
     assert bucket in rc["quilt+uri"]
     assert "@" in rc["quilt+uri"]
     assert "top_hash" in rc
+
+
+def test_table_formats(handler):
+    assert handler.TableFormats("csv") == ["csv"]
+    assert handler.TableFormats("CSV, parquet") == ["csv", "parquet"]
+    with pytest.raises(ValueError):
+        handler.TableFormats("xlsx")
+
+
+def test_download_report_parquet(handler, root):
+    handler.cc.put("TABLE_FORMAT", "csv,parquet")
+    tables = handler.downloadReport(CTX["REPORT"], root)
+    assert len(tables) == 10
+    csv = Path(tables["RecalTable2.csv"])
+    parquet = Path(tables["RecalTable2.parquet"])
+    assert parquet.stat().st_size < csv.stat().st_size
+    frame = pd.read_parquet(parquet)
+    assert frame["Observations"].dtype == "int64"
+    assert len(frame) == 10947
+    for table in tables.values():
+        if table.endswith(".parquet"):
+            Path(table).unlink()
+
+
+def test_in_place_selector(handler):
+    select = handler.InPlaceSelector("bucket", "omics-quilt/3395667")
+
+    def entry(url):
+        return type("Entry", (), {"physical_key": PhysicalKey.from_url(url)})
+
+    assert not select("a.bam", entry("s3://bucket/omics-quilt/3395667/a.bam"))
+    assert select("a.bam", entry("s3://bucket/omics-quilt/3395668/a.bam"))
+    assert select("a.bam", entry("s3://other/omics-quilt/3395667/a.bam"))
+    assert select("a.csv", entry("file:///tmp/a.csv"))
+
+
+def test_configure_transfer(handler, monkeypatch):
+    monkeypatch.setattr(data_transfer, "MAX_CONCURRENCY", 10)
+    monkeypatch.setattr(GSAHandler, "_transfer", None)
+    handler.cc.put("TRANSFER_CONCURRENCY", "32")
+    assert handler.configureTransfer() == {"concurrency": 32}
+    handler.cc.put("TRANSFER_CONCURRENCY", "8")
+    assert handler.configureTransfer() == {"concurrency": 32}
+    assert data_transfer.MAX_CONCURRENCY == 32
+
+
+def test_run_pipeline(handler, root, monkeypatch):
+    shutil.copytree(Path(CTX["REPORT"]).parent.parent.parent, root / "run")
+    run = root / "run"
+    for table in (run / "out").glob("*.csv"):
+        table.unlink()
+    pushed = {}
+
+    def push(root, opts, meta, prior, manifest, checkpoint):
+        pushed.update(meta=meta, prior=prior, manifest=manifest)
+        return meta
+
+    monkeypatch.setattr(handler, "pushFolder", push)
+    monkeypatch.setattr(PackageDelta, "Browse", lambda name, registry: None)
+    opts = {"uri": "s3://bucket/omics-quilt/8637245", "package": "omics-quilt/8637245"}
+    meta = asyncio.run(handler.runPipeline(run, opts))
+    assert meta["options"] == opts
+    assert "input" not in meta
+    assert pushed["prior"] is None
+    assert "out/RecalTable2.csv" in pushed["manifest"].keys()
+    assert "quilt_summarize.json" in pushed["manifest"].keys()
+    assert (run / "out" / "RecalTable2.csv").exists()
+    assert meta["recal"]["observations"] == 1069530131
+    assert (run / "out" / "recal_summary.json").exists()
+    summary = json.loads((run / "quilt_summarize.json").read_text())
+    assert len(summary) == 7
+
+
+def test_summarize_entries(handler, root):
+    tables = {"A.csv": str(root / "out" / "A.csv")}
+    entries = {"a.vl.json": {"path": str(root / "out" / "a.vl.json"), "title": "A"}}
+    summary = json.loads(handler.summarizeTables(tables, root).read_text())
+    assert summary == ["out/A.csv"]
+    summary = json.loads(handler.summarizeTables(tables, root, entries).read_text())
+    assert summary == [{"path": "out/a.vl.json", "title": "A"}]
+    assert handler.summaryAssets() is None
+    handler.cc.put("SUMMARY_PREVIEWS", "true")
+    assert handler.summaryAssets() is not None
+
+
+def test_recal_index(handler, root):
+    assert handler.recalIndex() is None
+    handler.cc.put("RECAL_INDEX", str(root / "index"))
+    assert handler.recalIndex().root == root / "index"
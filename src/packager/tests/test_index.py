@@ -1,5 +1,6 @@
+import json
 import pytest
-from packager import handler, Constants, PseudoContext
+from packager import batch_handler, handler, Constants, PseudoContext
 from .conftest import CTX
 
 
@@ -45,3 +46,49 @@ def test_valid_type(ctx, event):
     body = result["body"]
     assert body
     print(body)
+
+
+def sqs_record(message_id, event):
+    return {"messageId": message_id, "body": json.dumps(event)}
+
+
+def test_batch(ctx, event):
+    other = json.loads(json.dumps(event))
+    other["detail"]["runOutputUri"] += "0"
+    bad = {"detail-type": "Run Status Change", "detail": {"status": "COMPLETED"}}
+    batch = {
+        "Records": [
+            sqs_record("a", event),
+            sqs_record("b", event),
+            sqs_record("c", other),
+            sqs_record("d", bad),
+        ]
+    }
+    result = batch_handler(batch, ctx)
+    assert result["duplicates"] == ["b"]
+    assert result["batchItemFailures"] == [{"itemIdentifier": "d"}]
+    assert result["results"]["a"]["statusCode"] == 201
+    assert result["results"]["c"]["statusCode"] == 201
+
+
+def test_batch_events(ctx, event):
+    result = batch_handler([event], ctx)
+    assert result["batchItemFailures"] == []
+    assert result["results"][event["id"]]["statusCode"] == 201
+
+
+def test_batch_malformed(ctx, event):
+    batch = {
+        "Records": [
+            sqs_record("a", event),
+            {"messageId": "b", "body": "{not json"},
+            {"messageId": "c", "body": "[1, 2]"},
+        ]
+    }
+    result = batch_handler(batch, ctx)
+    assert result["batchItemFailures"] == [
+        {"itemIdentifier": "b"},
+        {"itemIdentifier": "c"},
+    ]
+    assert result["results"]["a"]["statusCode"] == 201
+    assert result["results"]["b"]["statusCode"] == 400
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import pytest
+import shutil
+
+from packager import GSAHandler
+from packager.instrumentation import Instrumentation
+from pathlib import Path
+from .conftest import CTX
+
+
+def test_stages():
+    run = Instrumentation("log")
+    with run.stage("push"):
+        pass
+    assert list(run.timed(iter([1, 2]), "parse")) == [1, 2]
+    run.count("download_bytes", 10, "Bytes")
+    run.count("download_bytes", 5, "Bytes")
+    report = run.report()
+    assert set(report["timings_ms"]) == {"push", "parse"}
+    assert report["counters"] == {"download_bytes": 15}
+    with pytest.raises(ValueError):
+        Instrumentation("verbose")
+
+
+def test_off():
+    run = Instrumentation("off")
+    with run.stage("push"):
+        run.count("objects")
+    assert run.report() == {"timings_ms": {}, "counters": {}}
+    assert Instrumentation.Current().active is False
+
+
+def test_current_in_threads():
+    async def work():
+        await asyncio.to_thread(lambda: Instrumentation.Current().count("objects"))
+
+    with Instrumentation.Run("log") as run:
+        assert Instrumentation.Current() is run
+        asyncio.run(work())
+    assert run.counters == {"objects": 1}
+    assert Instrumentation.Current() is not run
+
+
+def test_emf(capsys):
+    run = Instrumentation("emf")
+    with run.stage("push"):
+        run.count("objects", 3)
+    run.flush(run_uri="s3://bucket/run")
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    emf = [line for line in lines if "_aws" in line][0]
+    assert emf["objects"] == [3.0]
+    assert emf["run_uri"] == "s3://bucket/run"
+
+
+def test_pipeline_stages(tmp_path):
+    run_dir = tmp_path / "run"
+    shutil.copytree(Path(CTX["REPORT"]).parent.parent.parent, run_dir)
+    report = run_dir / "out" / "bqsr_report" / Path(CTX["REPORT"]).name
+    with Instrumentation.Run("log") as run:
+        GSAHandler({}).downloadReport(str(report), run_dir)
+    assert {"download", "parse", "write.RecalTable2"} <= set(run.timings)
+    assert run.counters["tables_written"] == 5
@@ -0,0 +1,299 @@
+import asyncio
+import json
+import os
+import pytest
+import time
+
+from packager import GSAHandler
+from packager.package_checkpoint import CheckpointHeld, PackageCheckpoint
+from packager.run_manifest import RunManifest
+from pathlib import Path
+from quilt3 import Package, checksums  # type: ignore
+from .conftest import CTX
+from .fake_s3 import FakeS3Client
+
+FILES = 10
+BATCH = 3
+
+
+class Interrupted(Exception):
+    pass
+
+
+class Hasher:
+    """Hashes entries until `limit` is reached, then dies mid-run"""
+
+    def __init__(self, limit=None, hash=PackageCheckpoint.Hash):
+        self.limit = limit
+        self.hash = hash
+        self.hashed = []
+
+    def __call__(self, entries):
+        if self.limit is not None and len(self.hashed) + len(entries) > self.limit:
+            raise Interrupted()
+        self.hashed += [entry.physical_key.path for entry in entries]
+        return self.hash(entries)
+
+
+@pytest.fixture
+def run(tmp_path):
+    root = tmp_path / "run"
+    for i in range(FILES):
+        path = root / "out" / f"part-{i:02d}.txt"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"part {i}\n" * (i + 1))
+    return root
+
+
+@pytest.fixture
+def uri(tmp_path):
+    return PackageCheckpoint.Uri(str(tmp_path / "checkpoints"), "omics-quilt/run")
+
+
+def attempt(uri, pkg, hasher, sources={}):
+    checkpoint = PackageCheckpoint(uri, sources, hasher=hasher, batch_size=BATCH)
+    checkpoint.load().claim(60)
+    restored = checkpoint.restore(pkg)
+    return checkpoint, restored
+
+
+def top_hash(run):
+    pkg = RunManifest(str(run)).load().package()
+    pkg._calculate_missing_hashes()
+    return pkg.top_hash
+
+
+@pytest.mark.parametrize("stop", [0, 2, 3, 5, 9])
+def test_resume(run, uri, stop):
+    first = RunManifest(str(run)).load().package()
+    checkpoint, restored = attempt(uri, first, Hasher(stop))
+    assert restored == 0
+    with pytest.raises(Interrupted):
+        checkpoint.hash(first)
+    saved = stop // BATCH * BATCH
+
+    hasher = Hasher()
+    second = RunManifest(str(run)).load().package()
+    checkpoint, restored = attempt(uri, second, hasher)
+    assert restored == saved
+    assert checkpoint.state["attempts"] == 2
+    assert checkpoint.hash(second)["hashed"] == FILES - saved
+    assert len(hasher.hashed) == FILES - saved
+    assert second.top_hash == top_hash(run)
+
+
+def test_changed_entry(run, uri):
+    pkg = RunManifest(str(run)).load().package()
+    attempt(uri, pkg, Hasher())[0].hash(pkg)
+    changed = run / "out" / "part-04.txt"
+    changed.write_text("changed\n")
+    os.utime(changed, ns=(0, time.time_ns() + 1_000_000_000))
+
+    hasher = Hasher()
+    pkg = RunManifest(str(run)).load().package()
+    checkpoint, restored = attempt(uri, pkg, hasher)
+    assert restored == FILES - 1
+    checkpoint.hash(pkg)
+    assert hasher.hashed == [str(changed)]
+    assert pkg.top_hash == top_hash(run)
+
+
+def test_failed_hashes(run, uri):
+    def hash(entries):
+        results = PackageCheckpoint.Hash(entries)
+        results[-1] = OSError("unreachable")
+        return results
+
+    pkg = RunManifest(str(run)).load().package()
+    checkpoint, _ = attempt(uri, pkg, Hasher(hash=hash))
+    with pytest.raises(OSError):
+        checkpoint.hash(pkg)
+    assert len(PackageCheckpoint(uri).load().state["entries"]) == BATCH - 1
+
+
+def test_corrupt_state(run, uri):
+    checkpoint = PackageCheckpoint(uri)
+    checkpoint.save()
+    with open(uri, "w") as state:
+        state.write("{truncated")
+    assert checkpoint.load().state == {"entries": {}}
+
+
+def test_stalled_and_pushed(run, uri):
+    pkg = RunManifest(str(run)).load().package()
+    checkpoint, _ = attempt(uri, pkg, Hasher())
+    assert not checkpoint.stalled()
+    assert checkpoint.held()
+    assert checkpoint.stalled(now=time.time() + 61)
+    assert not checkpoint.held(now=time.time() + 61)
+    checkpoint.hash(pkg)
+    assert checkpoint.pushed(pkg) is None
+    checkpoint.complete(pkg.top_hash)
+    assert not PackageCheckpoint(uri).load().stalled(now=time.time() + 61)
+    assert PackageCheckpoint(uri).load().pushed(pkg) == pkg.top_hash
+
+
+def test_resume_s3(uri):
+    client = FakeS3Client()
+    for i in range(FILES):
+        key = f"omics-quilt/run/out/part-{i:02d}.bin"
+        client.put_object(Bucket="bucket", Key=key, Body=bytes([i]) * 64)
+
+    hash_type = checksums.SHA256_CHUNKED_HASH_NAME
+
+    def hash(entries):
+        return [
+            {
+                "type": hash_type,
+                "value": checksums.calculate_multipart_checksum_bytes(
+                    client.objects[entry.physical_key.path], checksum_type=hash_type
+                ),
+            }
+            for entry in entries
+        ]
+
+    def package():
+        manifest = RunManifest("s3://bucket/omics-quilt/run", True, client).load()
+        return manifest.package(), manifest.sources()
+
+    pkg, sources = package()
+    checkpoint, _ = attempt(uri, pkg, Hasher(5, hash), sources)
+    with pytest.raises(Interrupted):
+        checkpoint.hash(pkg)
+    client.objects["omics-quilt/run/out/part-00.bin"] = b"rewritten"
+
+    pkg, sources = package()
+    hasher = Hasher(hash=hash)
+    checkpoint, restored = attempt(uri, pkg, hasher, sources)
+    assert restored == BATCH - 1
+    checkpoint.hash(pkg)
+    assert len(hasher.hashed) == FILES - BATCH + 1
+    assert "omics-quilt/run/out/part-00.bin" in hasher.hashed
+
+
+def test_handler_resume(run, tmp_path, monkeypatch):
+    pushes = []
+
+    def push(self, *args, **kwargs):
+        pushes.append(self.top_hash)
+        return self
+
+    monkeypatch.setattr(Package, "push", push)
+    hasher = Hasher(BATCH)
+    monkeypatch.setattr(PackageCheckpoint, "Hash", staticmethod(hasher))
+    handler = GSAHandler(
+        {
+            "CHECKPOINTS": "true",
+            "CHECKPOINT_URI": str(tmp_path / "checkpoints"),
+            "CHECKPOINT_BATCH": str(BATCH),
+            "CHECKPOINT_LEASE": "0",
+        }
+    )
+    opts = {"uri": "s3://bucket/omics-quilt/run", "package": "omics-quilt/run"}
+
+    def package():
+        manifest = handler.runManifest(run).load()
+        return handler.pushFolder(run, opts, {}, None, manifest)
+
+    with pytest.raises(Interrupted):
+        package()
+    assert handler.checkpoint(opts).load().stalled()  # so the next attempt resumes
+    assert pushes == []
+
+    hasher.limit = None
+    meta = package()
+    assert len(hasher.hashed) == FILES
+    assert pushes == [meta["top_hash"]]
+    assert not handler.checkpoint(opts).load().held()
+
+    assert package()["top_hash"] == meta["top_hash"]
+    assert len(pushes) == 1
+
+
+def test_disabled():
+    handler = GSAHandler({})
+    opts = {"uri": "s3://bucket/omics-quilt/run", "package": "omics-quilt/run"}
+    assert handler.checkpoint(opts) is None
+    assert handler.claimCheckpoint(opts) is None
+
+
+def test_lease(tmp_path, monkeypatch):
+    settings = {
+        "CHECKPOINTS": "true",
+        "CHECKPOINT_URI": str(tmp_path),
+        "CHECKPOINT_LEASE": "60",
+    }
+    handler = GSAHandler(settings)
+    event = json.loads(Path(CTX["EVENT"]).read_text())
+    event.pop("debug", None)
+    opts = handler.parseEvent(event)
+    checkpoint = handler.checkpoint(opts)
+    assert checkpoint.lease == 60
+    checkpoint.load().claim()
+    with pytest.raises(CheckpointHeld):
+        handler.claimCheckpoint(opts)
+
+    monkeypatch.setattr(handler.cc, "check_time", lambda uri: True)
+    with pytest.raises(CheckpointHeld):
+        asyncio.run(handler.handleEventAsync(event))
+
+    def unexpected(*args):
+        raise AssertionError("debounced events must not read the checkpoint")
+
+    monkeypatch.setattr(handler.cc, "check_time", lambda uri: False)
+    monkeypatch.setattr(handler, "checkpoint", unexpected)
+    result = asyncio.run(handler.handleEventAsync(event))
+    assert result["body"]["message"] == "Not ready"
+    monkeypatch.undo()
+
+    checkpoint.complete("top")
+    assert handler.claimCheckpoint(opts).state["attempts"] == 2
+
+
+def test_lease_remaining_time(tmp_path):
+    class Context:
+        def get_remaining_time_in_millis(self):
+            return 30_000
+
+    handler = GSAHandler(Context())
+    handler.cc = GSAHandler({"CHECKPOINTS": "1", "CHECKPOINT_URI": str(tmp_path)}).cc
+    opts = {"uri": "s3://bucket/omics-quilt/run", "package": "omics-quilt/run"}
+    assert handler.checkpoint(opts).lease == 30.0
+
+
+def test_release(tmp_path, monkeypatch):
+    handler = GSAHandler({"CHECKPOINTS": "1", "CHECKPOINT_URI": str(tmp_path)})
+    event = json.loads(Path(CTX["EVENT"]).read_text())
+    event.pop("debug", None)
+    opts = handler.parseEvent(event)
+
+    async def fail(*args):
+        raise Interrupted()
+
+    monkeypatch.setattr(handler.cc, "check_time", lambda uri: True)
+    monkeypatch.setattr(handler, "runPipeline", fail)
+    with pytest.raises(Interrupted):
+        asyncio.run(handler.handleEventAsync(event))
+    assert handler.checkpoint(opts).load().stalled()
+
+
+def test_acquire_s3(monkeypatch):
+    client = FakeS3Client()
+    key = "checkpoints/omics-quilt/run.json"
+    uri = f"s3://bucket/{key}"
+    assert PackageCheckpoint(uri, lease=60, client=client).acquire() == 1
+    with pytest.raises(CheckpointHeld):
+        PackageCheckpoint(uri, client=client).acquire()
+    client.objects[key] = json.dumps({"attempts": 1, "deadline": 0}).encode()
+
+    second = PackageCheckpoint(uri, client=client)
+    check = second.check
+
+    def race():
+        check()
+        PackageCheckpoint(uri, client=client).acquire()  # wins between read and write
+
+    monkeypatch.setattr(second, "check", race)
+    with pytest.raises(CheckpointHeld):
+        second.acquire()
+    assert json.loads(client.objects[key])["attempts"] == 2
@@ -0,0 +1,80 @@
+import pytest
+
+from botocore.exceptions import ClientError  # type: ignore
+from packager.package_delta import PackageDelta, SOURCE_META
+from packager.package_meta import META_FOLDER
+from pathlib import Path
+from quilt3 import Package  # type: ignore
+from quilt3.util import PhysicalKey  # type: ignore
+from tempfile import TemporaryDirectory
+
+
+@pytest.fixture
+def folder():
+    with TemporaryDirectory() as tempdir:
+        root = Path(tempdir)
+        (root / "same.txt").write_text("same")
+        (root / "edit.txt").write_text("before")
+        (root / "gone.txt").write_text("gone")
+        yield root
+
+
+def build(root: Path) -> Package:
+    pkg = Package()
+    pkg.set_dir(".", path=str(root))
+    return pkg
+
+
+def prior_of(root: Path) -> Package:
+    pkg = build(root)
+    PackageDelta(None).apply(pkg)
+    for logical_key, entry in pkg.walk():
+        entry.hash = {"type": "SHA256", "value": logical_key}
+        entry.physical_key = PhysicalKey("bucket", f"pkg/{logical_key}", "v1")
+    return pkg
+
+
+def test_first_revision(folder):
+    delta = PackageDelta(None)
+    diff = delta.apply(build(folder))
+    assert sorted(diff["added"]) == ["edit.txt", "gone.txt", "same.txt"]
+    assert diff["unchanged"] == 0
+
+
+def test_delta(folder):
+    prior = prior_of(folder)
+    (folder / "edit.txt").write_text("after, and longer")
+    (folder / "gone.txt").unlink()
+    (folder / "new.txt").write_text("new")
+    pkg = build(folder)
+    diff = PackageDelta(prior).apply(pkg)
+    assert diff == {
+        "added": ["new.txt"],
+        "changed": ["edit.txt"],
+        "removed": ["gone.txt"],
+        "unchanged": 1,
+    }
+    same = pkg["same.txt"]
+    assert same.hash == {"type": "SHA256", "value": "same.txt"}
+    assert same.physical_key.bucket == "bucket"
+    assert pkg["edit.txt"].hash is None
+    assert "mtime" in pkg["edit.txt"].meta[SOURCE_META]
+
+
+def test_meta_not_removed(folder):
+    prior = prior_of(folder)
+    prior.set(f"{META_FOLDER}/summary.json", str(folder / "same.txt"))
+    diff = PackageDelta(prior).apply(build(folder))
+    assert diff["removed"] == []
+
+
+def test_browse_not_found(monkeypatch):
+    def browse(name, registry):
+        raise ClientError({"Error": {"Code": code}}, "GetObject")
+
+    monkeypatch.setattr(Package, "browse", browse)
+    code = "NoSuchKey"
+    assert PackageDelta.Browse("a/b", "s3://bucket") is None
+    code = "AccessDenied"
+    with pytest.raises(ClientError):
+        PackageDelta.Browse("a/b", "s3://bucket")
@@ -0,0 +1,121 @@
+import json
+
+from pathlib import Path
+
+from packager import GSAHandler
+from packager.package_meta import PackageMeta
+from quilt3 import Package  # type: ignore
+
+
+def large_meta():
+    return {
+        "status": "COMPLETED",
+        "parameters": {
+            f"sample_{i}": f"s3://bucket/fastq/{i}.fq.gz" for i in range(500)
+        },
+        "options": {"package": "omics-quilt/run", "uri": "s3://bucket/run"},
+        "context": {
+            "AWS_SECRET_ACCESS_KEY": "secret",
+            "AWS_REGION": "us-east-1",
+            "PATH": "/usr/bin",
+            "GITHUB_TOKEN": "token",
+            "QUILT_METADATA": "quilt_metadata.json",
+        },
+    }
+
+
+def test_clean(monkeypatch):
+    monkeypatch.setenv("STAGE", "dev")
+    context = {"STAGE": "dev", "API_KEY": "k", "_HANDLER": "x", "PREVIEW_ROWS": 5}
+    assert PackageMeta.Clean(context) == {"PREVIEW_ROWS": 5}
+
+
+def test_message():
+    opts = {"package": "a/b", "uri": "s3://b/a/b", "detail": {"big": [1] * 100}}
+    assert json.loads(PackageMeta.Message(opts)) == {
+        "package": "a/b",
+        "uri": "s3://b/a/b",
+    }
+
+
+def test_compact():
+    meta = large_meta()
+    compact = PackageMeta(budget=4096)
+    inline = compact.compact(meta)
+    assert PackageMeta.Size(inline) <= 4096
+    assert inline["status"] == "COMPLETED"
+    assert inline["options"] == meta["options"]
+    assert inline["context"] == {"QUILT_METADATA": "quilt_metadata.json"}
+    ref = inline["parameters"]
+    assert ref["$ref"] == "_meta/parameters.json"
+    data, hash = compact.external[ref["$ref"]]
+    assert json.loads(data) == meta["parameters"]
+    assert ref["size"] == len(data)
+    assert ref["hash"] == hash == compact.hash(data)
+    assert "AWS_REGION" in meta["context"]
+
+
+def test_small_meta_inline():
+    compact = PackageMeta()
+    meta = {"status": "COMPLETED", "options": {"package": "a/b"}}
+    assert compact.compact(meta) == meta
+    assert compact.external == {}
+
+
+def test_apply(tmp_path):
+    pkg = Package()
+    stats = PackageMeta(budget=4096).apply(pkg, large_meta(), tmp_path)
+    assert stats["external"] == ["_meta/parameters.json"]
+    entry = pkg["_meta/parameters.json"]
+    assert entry.hash == pkg.meta["parameters"]["hash"]
+    assert json.loads(entry.get_bytes())["sample_0"] == "s3://bucket/fastq/0.fq.gz"
+    pkg._calculate_missing_hashes()
+    assert entry.hash == pkg.meta["parameters"]["hash"]
+
+
+def test_handler_budget(tmp_path, monkeypatch):
+    pushed = []
+
+    def push(self, *args, **kwargs):
+        self._calculate_missing_hashes()
+        pushed.append((self.meta, kwargs["message"], self["_meta"]))
+        return self
+
+    monkeypatch.setattr(Package, "push", push)
+    root = tmp_path / "run"
+    root.mkdir()
+    (root / "out.txt").write_text("out\n")
+    (root / "quilt_metadata.json").write_text(json.dumps(large_meta()))
+    opts = {"uri": "s3://bucket/omics-quilt/run", "package": "omics-quilt/run"}
+    handler = GSAHandler({"META_BUDGET": "4096"})
+    meta = handler.readMeta(root, opts)
+    manifest = handler.runManifest(root).load()
+    result = handler.pushFolder(root, opts, meta, None, manifest)
+    stored, message, folder = pushed[0]
+    assert stored["parameters"]["$ref"] == "_meta/parameters.json"
+    assert "_meta/parameters.json" not in [key for key, _ in folder.walk()]
+    assert "parameters.json" in folder
+    assert json.loads(message) == opts
+    assert result["parameters"] == large_meta()["parameters"]
+
+
+def test_unsafe_keys(tmp_path):
+    blob = ["x" * 100] * 20
+    meta = {"a.b": blob, "a/b": blob, "../up": blob, "": blob}
+    compact = PackageMeta(budget=1024)
+    pkg = Package()
+    compact.apply(pkg, meta, tmp_path)
+    refs = sorted(ref["$ref"] for ref in pkg.meta.values())
+    assert refs == [
+        "_meta/_.json",
+        "_meta/___up.json",
+        "_meta/a_b.json",
+        "_meta/a_b_2.json",
+    ]
+    for ref in pkg.meta.values():
+        assert pkg[ref["$ref"]].hash == ref["hash"]
+    assert sorted(p.name for p in (tmp_path / "_meta").iterdir()) == [
+        Path(ref).name for ref in refs
+    ]
+    assert compact.compact({"small": 1}) == {"small": 1}
+    assert compact.external == {}
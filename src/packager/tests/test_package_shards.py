@@ -0,0 +1,187 @@
+import io
+import json
+import pytest
+
+from packager import GSAHandler, shard_handler
+from packager.package_shards import PackageShards
+from packager.run_manifest import RunManifest
+from quilt3 import Package, checksums  # type: ignore
+from .fake_s3 import FakeS3Client
+
+MIB = 1024 * 1024
+CHUNK = 8 * MIB
+
+
+class FakeLambda:
+    """Runs each invocation through `shard_handler` in-process"""
+
+    def __init__(self) -> None:
+        self.invocations = 0
+
+    def invoke(self, FunctionName, Payload):
+        self.invocations += 1
+        result = shard_handler(json.loads(Payload), {})
+        return {"Payload": io.BytesIO(json.dumps(result).encode())}
+
+
+@pytest.fixture
+def run(tmp_path):
+    root = tmp_path / "run"
+    (root / "out").mkdir(parents=True)
+    (root / "out" / "large.cram").write_bytes(bytes(range(256)) * (20 * MIB // 256))
+    (root / "out" / "small.txt").write_text("small\n")
+    (root / "out" / "empty.txt").write_bytes(b"")
+    return root
+
+
+def expected(run):
+    pkg = RunManifest(str(run)).load().package()
+    pkg._calculate_missing_hashes()
+    return {key: entry.hash for key, entry in pkg.walk()}
+
+
+def hashed(run, shards):
+    pkg = RunManifest(str(run)).load().package()
+    counts = shards.apply(pkg)
+    return {key: entry.hash for key, entry in pkg.walk()}, counts
+
+
+def test_pieces():
+    entries = [("a", "file:///a", 20 * MIB), ("b", "file:///b", 0), ("c", "", 10)]
+    pieces = PackageShards.Pieces(entries, CHUNK)
+    assert [(p["key"], p["start"], p["end"]) for p in pieces] == [
+        ("a", 0, CHUNK),
+        ("a", CHUNK, 2 * CHUNK),
+        ("a", 2 * CHUNK, 20 * MIB),
+        ("c", 0, 10),
+    ]
+    assert len(PackageShards.Pieces(entries, 3 * CHUNK)) == 2
+    assert len(PackageShards.Pieces(entries, 1)) == 4
+
+
+def test_partition():
+    sizes = [9, 7, 5, 4, 3, 2, 1]
+    pieces = [{"key": str(i), "start": 0, "end": n} for i, n in enumerate(sizes)]
+    shards = PackageShards.Partition(pieces, 3)
+    loads = sorted(sum(p["end"] for p in shard) for shard in shards)
+    assert loads == [10, 10, 11]
+    assert len(PackageShards.Partition(pieces[:2], 3)) == 2
+
+
+def test_combine_matches_quilt():
+    data = bytes(range(256)) * (20 * MIB // 256)
+    pieces = PackageShards.Pieces([("k", "", len(data))], CHUNK)
+    partials = [
+        {
+            "key": "k",
+            "start": piece["start"],
+            "digests": [FakeS3Client._sha256(data[piece["start"] : piece["end"]])],
+        }
+        for piece in reversed(pieces)
+    ]
+    hashes = PackageShards.Combine(["k", "empty"], partials)
+    hash_type = checksums.SHA256_CHUNKED_HASH_NAME
+    assert hashes["k"] == checksums.calculate_multipart_checksum_bytes(
+        data, checksum_type=hash_type
+    )
+    assert hashes["empty"] == checksums.calculate_multipart_checksum_bytes(
+        b"", checksum_type=hash_type
+    )
+
+
+def test_process_pool(run):
+    hashes, counts = hashed(run, PackageShards(2, "process", piece_bytes=CHUNK))
+    assert hashes == expected(run)
+    assert counts == {"hashed": 3, "shards": 2, "pieces": 4, "bytes": 20 * MIB + 6}
+
+
+def test_threads_s3():
+    client = FakeS3Client()
+    large = bytes(range(256)) * (20 * MIB // 256)
+    client.put_object(Bucket="bucket", Key="run/large.cram", Body=large)
+    client.put_object(Bucket="bucket", Key="run/small.txt", Body=b"small\n")
+    pkg = RunManifest("s3://bucket/run", True, client).load().package()
+    shards = PackageShards(3, "thread", piece_bytes=CHUNK, client=client)
+    assert shards.apply(pkg)["shards"] == 3
+    hash_type = checksums.SHA256_CHUNKED_HASH_NAME
+    for key, body in [("large.cram", large), ("small.txt", b"small\n")]:
+        assert pkg[key].hash == {
+            "type": hash_type,
+            "value": checksums.calculate_multipart_checksum_bytes(
+                body, checksum_type=hash_type
+            ),
+        }
+    assert client.calls["get_object"] == 4
+
+
+def test_lambda(run):
+    client = FakeLambda()
+    shards = PackageShards(2, "lambda", "shard-fn", piece_bytes=CHUNK, client=client)
+    hashes, _ = hashed(run, shards)
+    assert hashes == expected(run)
+    assert client.invocations == 2
+    with pytest.raises(ValueError):
+        PackageShards(2, "lambda")
+    with pytest.raises(ValueError):
+        PackageShards(2, "cluster")
+
+
+def test_handler_sharded(run, tmp_path, monkeypatch):
+    unhashed = []
+
+    def push(self, *args, **kwargs):
+        unhashed.append(sum(entry.hash is None for _, entry in self.walk()))
+        self._calculate_missing_hashes()
+        return self
+
+    monkeypatch.setattr(Package, "push", push)
+    opts = {"uri": "s3://bucket/omics-quilt/run", "package": "omics-quilt/run"}
+    settings = {"HASH_SHARDS": "2"}
+
+    def package(settings):
+        handler = GSAHandler(settings)
+        manifest = handler.runManifest(run).load()
+        return handler.pushFolder(run, opts, {}, None, manifest)["top_hash"]
+
+    assert GSAHandler({}).packageShards() is None
+    assert GSAHandler(settings).packageShards().mode == "thread"
+    top_hash = package({})
+    assert package(settings) == top_hash
+    checkpoints = {"CHECKPOINTS": "1", "CHECKPOINT_URI": str(tmp_path)}
+    assert package({**settings, **checkpoints}) == top_hash
+    assert unhashed == [3, 0, 0]
+
+
+def test_client_per_bucket(monkeypatch):
+    client = FakeS3Client()
+    client.put_object(Bucket="bucket", Key="run/large.cram", Body=b"x" * 3 * CHUNK)
+    built = []
+
+    def build(bucket, params):
+        built.append(bucket)
+        return client
+
+    monkeypatch.setattr("packager.s3_checksums.S3Checksums.Client", build)
+    pkg = RunManifest("s3://bucket/run", True, client).load().package()
+    assert PackageShards(1, piece_bytes=CHUNK).apply(pkg)["pieces"] == 3
+    assert built == ["bucket"]
+
+
+def test_lambda_client(monkeypatch):
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    config = PackageShards.LambdaClient(42.0).meta.config
+    assert config.read_timeout == 42.0
+    assert config.retries["total_max_attempts"] == 1
+    assert PackageShards.LambdaClient().meta.config.read_timeout == 900
+
+
+def test_shard_timeout():
+    class Context:
+        def get_remaining_time_in_millis(self):
+            return 30_000
+
+    settings = {"HASH_SHARDS": "2"}
+    assert GSAHandler(settings).packageShards().timeout is None
+    handler = GSAHandler(Context())
+    handler.cc = GSAHandler(settings).cc
+    assert handler.packageShards().timeout == 30.0
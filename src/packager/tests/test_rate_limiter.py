@@ -0,0 +1,155 @@
+import boto3  # type: ignore
+import json
+import pytest
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from packager import Constants, Instrumentation
+from packager.rate_limiter import RateLimiter
+from packager.ssm_parameter_store import SSMParameterStore
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class ThrottlingSSM(BaseHTTPRequestHandler):
+    """Answers GetParameter, throttling the first `throttles` requests"""
+
+    throttles = 0
+    requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).requests += 1
+        if type(self).requests <= type(self).throttles:
+            status = 400
+            body = {"__type": "ThrottlingException", "message": "Rate exceeded"}
+        else:
+            status = 200
+            body = {"Parameter": {"Name": "/a", "Value": "1", "Type": "String"}}
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/x-amz-json-1.1")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def clear():
+    RateLimiter.ClearCache()
+    yield
+    RateLimiter.ClearCache()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def endpoint():
+    ThrottlingSSM.requests = 0
+    ThrottlingSSM.throttles = 1
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingSSM)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_token_bucket(clock):
+    limiter = RateLimiter("ssm", 10, clock=clock, sleep=clock.sleep)
+    assert [limiter.acquire() for _ in range(10)] == [0.0] * 10
+    assert limiter.acquire() == pytest.approx(0.1)
+    clock.now += 0.5
+    assert [limiter.acquire() for _ in range(5)] == [0.0] * 5
+    assert limiter.acquire() > 0
+
+
+def test_adaptive_rate(clock):
+    limiter = RateLimiter("ssm", 40, clock=clock, sleep=clock.sleep)
+    limiter.throttled()
+    assert limiter.rate == 20
+    assert limiter.acquire() == pytest.approx(1 / 20)
+    for _ in range(10):
+        limiter.throttled()
+    assert limiter.rate == limiter.min_rate == pytest.approx(0.8)
+    for _ in range(100):
+        limiter.succeeded()
+    assert limiter.rate == 40
+    assert limiter.stats()["throttles"] == 11
+
+
+def test_configure():
+    assert RateLimiter.Shared("ssm").max_rate == 40
+    shared = RateLimiter.Shared("s3")
+    RateLimiter.Configure({})
+    assert RateLimiter.Shared("s3") is shared
+    RateLimiter.Configure({"RATE_LIMIT_SSM": "5", "RATE_LIMIT_S3": "0"})
+    assert RateLimiter.Shared("ssm").max_rate == 5
+    assert RateLimiter.Shared("s3") is None
+
+
+def test_setup_once():
+    Constants({"RATE_LIMIT_SSM": "7"})
+    limiter = RateLimiter.Shared("ssm")
+    assert limiter.max_rate == 7
+    limiter.throttled()
+    Constants({})
+    Constants({"RATE_LIMIT_SSM": "9"})
+    assert RateLimiter.Shared("ssm") is limiter
+    assert limiter.rate == 3.5
+
+
+def test_install(endpoint):
+    client = boto3.client(
+        "ssm",
+        region_name="us-east-1",
+        endpoint_url=endpoint,
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    assert RateLimiter.Install(client, "ssm") is client
+    RateLimiter.Install(client, "ssm")
+    with Instrumentation.Run() as run:
+        assert client.get_parameter(Name="/a")["Parameter"]["Value"] == "1"
+    assert ThrottlingSSM.requests == 2
+    assert run.counters == {"ssm_throttles": 1}
+    limiter = RateLimiter.Shared("ssm")
+    assert limiter.throttles == 1
+    assert 20 < limiter.rate < 40
+
+
+def test_quilt_clients(monkeypatch):
+    from quilt3 import hooks
+    from quilt3.data_transfer import S3ClientProvider
+
+    monkeypatch.setattr(hooks, "_build_client_hook", None)
+    monkeypatch.setattr(RateLimiter, "_quilt_hooked", False)
+    RateLimiter.InstallQuilt()
+    RateLimiter.InstallQuilt()
+    client = S3ClientProvider().standard_client
+    limiter = RateLimiter.Shared("s3")
+    client.meta.events.emit("before-send.s3.PutObject", request=None)
+    assert limiter.tokens == pytest.approx(limiter.capacity - 1, abs=0.01)
+
+
+def test_ssm_client():
+    SSMParameterStore.ClearCache()
+    client = SSMParameterStore.Client("us-west-2")
+    limiter = RateLimiter.Shared("ssm")
+    client.meta.events.emit("before-send.ssm.GetParameter", request=None)
+    assert limiter.tokens == pytest.approx(limiter.capacity - 1, abs=0.01)
+    SSMParameterStore.ClearCache()
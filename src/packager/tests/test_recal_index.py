@@ -0,0 +1,82 @@
+import pytest
+
+from packager import GatkReportStream, RecalIndex
+from packager.recal_index import COMPACTED, COVARIATES, METRICS
+from packager.recal_summary import RecalSummary
+from pathlib import Path
+from .conftest import CTX
+
+
+@pytest.fixture
+def summary():
+    summary = RecalSummary()
+    for name, table in GatkReportStream(Path(CTX["REPORT"])):
+        summary.add(name, table)
+    return summary
+
+
+@pytest.fixture
+def index(tmp_path):
+    return RecalIndex(str(tmp_path / "index"))
+
+
+def add_run(index, summary, run, time):
+    opts = {"package": f"omics-quilt/{run}", "time": time}
+    meta = {"top_hash": f"hash{run}", "quilt+uri": f"quilt+s3://b#package={run}"}
+    return index.append(opts, meta, summary)
+
+
+def test_append(index, summary):
+    written = add_run(index, summary, 1, "2024-12-19T00:04:50Z")
+    assert sorted(written) == [COVARIATES, METRICS]
+    assert "date=2024-12-19" in written[METRICS]
+    metrics = index.read(METRICS)
+    assert metrics.loc[0, "run_id"] == "omics-quilt_1"
+    assert metrics.loc[0, "observations"] == 1069530131
+
+
+def test_read_range(index, summary):
+    add_run(index, summary, 1, "2024-12-18T10:00:00Z")
+    add_run(index, summary, 2, "2024-12-19T10:00:00Z")
+    add_run(index, summary, 3, "2024-12-20T10:00:00Z")
+    metrics = index.read(METRICS, since="2024-12-19", columns=["run_id"])
+    assert list(metrics["run_id"]) == ["omics-quilt_2", "omics-quilt_3"]
+    assert index.read(METRICS, until="2024-01-01").empty
+
+
+def test_drift(index, summary):
+    add_run(index, summary, 1, "2024-12-19T10:00:00Z")
+    add_run(index, summary, 2, "2024-12-19T11:00:00Z")
+    drift = index.drift("Cycle")
+    assert list(drift.columns) == ["omics-quilt_1", "omics-quilt_2"]
+    assert len(drift) == summary.covariates["CovariateName"].eq("Cycle").sum()
+
+
+def test_compact(index, summary):
+    for run in [1, 2, 1]:
+        add_run(index, summary, run, "2024-12-19T10:00:00Z")
+    add_run(index, summary, 3, "2024-12-19T10:00:00Z")
+    compacted = index.compact(METRICS, "date=2024-12-19")
+    assert compacted is not None and COMPACTED in compacted
+    files = list((index.root / METRICS / "date=2024-12-19").iterdir())
+    assert len(files) == 1
+    metrics = index.read(METRICS)
+    assert sorted(metrics["run_id"]) == [
+        "omics-quilt_1",
+        "omics-quilt_2",
+        "omics-quilt_3",
+    ]
+    assert index.compact(METRICS, "date=2024-12-19") is None
+
+
+def test_rerun(index, summary):
+    first = add_run(index, summary, 1, "2024-12-19T10:00:00Z")
+    summary.read_groups = summary.read_groups.assign(Errors=0.0)
+    second = add_run(index, summary, 1, "2024-12-19T10:00:00Z")
+    assert first[METRICS] != second[METRICS]
+    assert Path(first[METRICS]).exists()
+    assert list(index.read(METRICS)["errors"]) == [2937430.0, 0.0]
+    index.compact(METRICS, "date=2024-12-19")
+    metrics = index.read(METRICS)
+    assert list(metrics["run_id"]) == ["omics-quilt_1"]
+    assert list(metrics["errors"]) == [0.0]
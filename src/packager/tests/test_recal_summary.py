@@ -0,0 +1,79 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import time
+
+from packager import GSAHandler, GatkReportStream
+from packager.recal_summary import RecalSummary
+from pathlib import Path
+from .conftest import CTX
+
+
+@pytest.fixture
+def summary():
+    summary = RecalSummary()
+    for name, table in GatkReportStream(Path(CTX["REPORT"])):
+        summary.add(name, table)
+    return summary
+
+
+def synthetic_table2(n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    cycles = rng.integers(-150, 150, n_rows).astype(str)
+    return pd.DataFrame(
+        {
+            "ReadGroup": rng.choice(["rg1", "rg2", "rg3", "rg4"], n_rows),
+            "QualityScore": rng.integers(2, 42, n_rows),
+            "CovariateValue": cycles,
+            "CovariateName": "Cycle",
+            "EventType": rng.choice(["M", "I", "D"], n_rows),
+            "EmpiricalQuality": rng.uniform(2, 45, n_rows),
+            "Observations": rng.integers(1, 1_000_000, n_rows),
+            "Errors": rng.uniform(0, 1000, n_rows),
+        }
+    )
+
+
+def test_headline(summary):
+    headline = summary.headline()
+    assert headline["read_groups"] == 1
+    assert headline["observations"] == 1069530131
+    assert headline["errors"] == 2937430.0
+    assert headline["quality_delta"] == pytest.approx(26.0 - 25.4716)
+    assert set(headline) >= {"cycle_delta_spread", "context_delta_spread"}
+
+
+def test_covariates(summary):
+    covariates = summary.covariates
+    cycle = covariates[covariates["CovariateName"] == "Cycle"]
+    assert cycle["Observations"].sum() == summary.quality["Observations"].sum()
+    assert not covariates.duplicated(["CovariateName", "CovariateValue"]).any()
+
+
+def test_write(summary, tmp_path):
+    files = summary.write(tmp_path, ["csv", "parquet"], GSAHandler.WriteTable)
+    assert sorted(files) == [
+        "recal_covariates.csv",
+        "recal_covariates.parquet",
+        "recal_summary.json",
+    ]
+    data = json.loads((tmp_path / "recal_summary.json").read_text())
+    assert data["headline"] == summary.headline()
+    table1 = dict(GatkReportStream(Path(CTX["REPORT"])))["RecalTable1"]
+    keys = ["ReadGroup", "QualityScore", "EventType"]
+    assert len(data["quality"]) == len(table1.drop_duplicates(keys)) > 1
+    assert {row["QualityScore"] for row in data["quality"]} == set(
+        table1["QualityScore"]
+    )
+
+
+def test_timing_large_table():
+    table = synthetic_table2(1_000_000)
+    summary = RecalSummary()
+    start = time.perf_counter()
+    summary.add("RecalTable2", table)
+    elapsed = time.perf_counter() - start
+    print(f"summarized {len(table)} rows in {elapsed:.3f}s")
+    assert summary.covariates is not None
+    assert summary.covariates["Observations"].sum() == table["Observations"].sum()
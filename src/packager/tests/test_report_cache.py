@@ -0,0 +1,60 @@
+import pytest
+import shutil
+
+from packager import GatkReportStream, GSAHandler
+from packager.report_cache import ReportCache
+from pathlib import Path
+from .conftest import CTX
+
+OUT_DIR = Path(CTX["REPORT"]).parent.parent
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ReportCache(tmp_path / "cache", 64 * 1024 * 1024)
+
+
+def test_key():
+    key = ReportCache.Key(CTX["REPORT"])
+    assert key is not None and len(key) == 64
+    assert ReportCache.Key(CTX["REPORT"]) == key
+    assert ReportCache.Key("./tests/outputs/missing.csv") is None
+
+
+def test_round_trip(cache):
+    key = ReportCache.Key(CTX["REPORT"])
+    assert cache.get(key) is None
+    stored = list(cache.store(key, GatkReportStream(Path(CTX["REPORT"]))))
+    cached = list(cache.get(key))
+    assert [name for name, _ in cached] == [name for name, _ in stored]
+    for (_, before), (_, after) in zip(stored, cached):
+        assert before.to_csv() == after.to_csv()
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_evict(tmp_path):
+    cache = ReportCache(tmp_path / "cache", 1)
+    key = ReportCache.Key(CTX["REPORT"])
+    list(cache.store(key, GatkReportStream(Path(CTX["REPORT"]))))
+    assert cache.get(key) is None
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_handler_cache(tmp_path):
+    run = tmp_path / "run"
+    shutil.copytree(OUT_DIR.parent, run)
+    report = str(run / "out" / "bqsr_report" / Path(CTX["REPORT"]).name)
+    handler = GSAHandler({"REPORT_CACHE": str(tmp_path / "cache")})
+    handler.downloadReport(report, run)
+    for table in (run / "out").glob("*.csv"):
+        table.unlink()
+    tables = handler.downloadReport(report, run)
+    assert handler.reportCache().stats()["hits"] == 1
+    for name, path in tables.items():
+        assert Path(path).read_text() == (OUT_DIR / name).read_text()
+
+
+def test_evict_vanished(cache):
+    # an entry another worker removed between the listing and the stat
+    (cache.root / "gone").symlink_to(cache.root / "missing")
+    assert cache.evict() == []
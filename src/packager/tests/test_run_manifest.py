@@ -0,0 +1,75 @@
+import pytest
+import time
+
+from packager.run_manifest import RunManifest
+from .fake_s3 import FakeS3Client
+
+ROOT = "s3://bucket/omics-quilt/8637245"
+
+
+@pytest.fixture
+def client():
+    client = FakeS3Client()
+    client.put_object(Bucket="bucket", Key="omics-quilt/8637245/out/a.csv", Body=b"a,b")
+    client.put_object(Bucket="bucket", Key="omics-quilt/8637245/out/", Body=b"")
+    client.put_object(Bucket="bucket", Key="omics-quilt/8637246/b.csv", Body=b"b")
+    return client
+
+
+def test_s3_manifest(client):
+    manifest = RunManifest(ROOT, versioned=True, client=client).load()
+    assert manifest.keys() == ["out/a.csv"]
+    assert manifest.requests == 1
+    assert client.calls["list_object_versions"] == 1
+    source = manifest.sources()["omics-quilt/8637245/out/a.csv"]
+    assert source["last_modified"] == "2024-01-01T00:00:00+00:00"
+    entry = manifest.package()["out/a.csv"]
+    assert entry.size == 3
+    assert entry.physical_key.version_id == "v-29"
+    assert entry.hash is None
+
+
+def test_unversioned(client):
+    manifest = RunManifest(ROOT, client=client).load()
+    assert client.calls["list_objects_v2"] == 1
+    assert manifest.package()["out/a.csv"].physical_key.version_id is None
+
+
+def test_add(client):
+    manifest = RunManifest(ROOT, versioned=True, client=client).load()
+    key = "omics-quilt/8637245/out/b.csv"
+    client.put_object(Bucket="bucket", Key=key, Body=b"b,c,d")
+    manifest.add(f"s3://bucket/{key}")
+    assert manifest.keys() == ["out/a.csv", "out/b.csv"]
+    assert client.calls["list_object_versions"] == 1
+    assert manifest.requests == 2
+    entry = manifest.package()["out/b.csv"]
+    assert entry.size == 5
+    assert entry.physical_key.version_id == "v-29"
+
+
+def test_local_manifest(tmp_path):
+    (tmp_path / "out").mkdir()
+    (tmp_path / "out" / "a.csv").write_text("a,b")
+    manifest = RunManifest(str(tmp_path)).load()
+    assert manifest.keys() == ["out/a.csv"]
+    assert manifest.sources() == {}
+    assert manifest.package()["out/a.csv"].size == 3
+    (tmp_path / "out" / "b.csv").write_text("b")
+    manifest.add(str(tmp_path / "out" / "b.csv"))
+    assert manifest.keys() == ["out/a.csv", "out/b.csv"]
+
+
+def test_benchmark_10k():
+    client = FakeS3Client()
+    for i in range(10_000):
+        key = f"omics-quilt/8637245/out/shard-{i // 100:03d}/part-{i:05d}.bam"
+        client.objects[key] = b"x" * (i % 7)
+    start = time.perf_counter()
+    manifest = RunManifest(ROOT, versioned=True, client=client).load()
+    pkg = manifest.package()
+    elapsed = time.perf_counter() - start
+    print(f"\nmanifest 10k: {dict(client.calls)} in {elapsed:.2f}s")
+    assert len(list(pkg.walk())) == 10_000
+    assert sum(client.calls.values()) == 10
+    assert client.calls["head_object"] == 0
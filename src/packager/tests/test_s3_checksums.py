@@ -0,0 +1,66 @@
+import pytest
+
+from packager.run_manifest import RunManifest
+from packager.s3_checksums import S3Checksums
+from quilt3 import checksums  # type: ignore
+from .fake_s3 import FakeS3Client
+
+ROOT = "s3://bucket/run"
+MIB = 1024 * 1024
+
+
+def quilt_hash(data):
+    return checksums.calculate_multipart_checksum_bytes(
+        data, checksum_type=checksums.SHA256_CHUNKED_HASH_NAME
+    )
+
+
+@pytest.fixture
+def client():
+    client = FakeS3Client()
+    small = b"small object"
+    large = bytes(range(256)) * (20 * MIB // 256)
+    client.put_object(Bucket="bucket", Key="run/small.txt", Body=small)
+    client.put_object(Bucket="bucket", Key="run/empty.txt", Body=b"")
+    client.put_object(
+        Bucket="bucket", Key="run/aligned.bam", Body=large, PartSize=8 * MIB
+    )
+    client.put_object(Bucket="bucket", Key="run/odd.bam", Body=large, PartSize=5 * MIB)
+    client.put_object(Bucket="bucket", Key="run/single.bam", Body=large)
+    return client
+
+
+def test_quilt_hash(client):
+    pkg = RunManifest(ROOT, client=client).load().package()
+    store = S3Checksums(client=client)
+    store.MAX_PARTS = 2  # exercise part pagination
+    stats = store.apply(pkg)
+    assert stats == {"reused": 3, "missing": 2, "requests": 6}
+    for key in ["small.txt", "empty.txt", "aligned.bam"]:
+        body = client.objects[f"run/{key}"]
+        assert pkg[key].hash == {"type": "sha2-256-chunked", "value": quilt_hash(body)}
+    assert pkg["odd.bam"].hash is None
+    assert pkg["single.bam"].hash is None
+    assert client.calls["get_object"] == 0
+
+
+def test_lookup_error(client):
+    pkg = RunManifest(ROOT, client=client).load().package()
+    del client.objects["run/small.txt"]
+    stats = S3Checksums(client=client).apply(pkg)
+    assert pkg["small.txt"].hash is None
+    assert stats["missing"] == 3
+
+
+def test_client_per_bucket(client, monkeypatch):
+    built = []
+
+    def build(bucket, params):
+        built.append((bucket, params["Key"]))
+        return client
+
+    monkeypatch.setattr(S3Checksums, "Client", staticmethod(build))
+    pkg = RunManifest(ROOT, client=client).load().package()
+    stats = S3Checksums().apply(pkg)
+    assert stats["reused"] == 3
+    assert len(built) == 1 and built[0][0] == "bucket"
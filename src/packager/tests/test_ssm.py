@@ -1,5 +1,7 @@
-from packager import SSMParameterStore
+from packager import SSMParameterStore, ttl_cache
+from .fake_ssm import FakeSSMClient
 import pytest
+import time
 
 
 @pytest.fixture
@@ -17,3 +19,100 @@ def test_slashes(store):
     assert "value" == store["key"]
     store["key/2"] = "value2"
     assert "value2" == store["key/2"]
+
+
+N_PARAMETERS = 10_000
+
+
+@pytest.fixture
+def fake():
+    client = FakeSSMClient()
+    for i in range(N_PARAMETERS):
+        client.parameters[f"/Bench/runs/{i}"] = str(i)
+    client.parameters["/Bench/config"] = "yes"
+    return client
+
+
+@pytest.fixture
+def bench(fake):
+    store = SSMParameterStore("Bench")
+    store._client = fake
+    return store
+
+
+def test_lazy_lookup(bench, fake):
+    assert bench["config"] == "yes"
+    assert "runs/42" in bench
+    assert "runs/missing" not in bench
+    assert fake.calls["describe_parameters"] == 0
+    assert bench["config"] == "yes"
+    assert fake.calls["get_parameter"] == 3
+
+
+def test_lazy_substore(bench, fake):
+    runs = bench["runs"]
+    assert isinstance(runs, SSMParameterStore)
+    assert runs["7"] == "7"
+    assert fake.calls["get_parameters_by_path"] == 1
+
+
+def test_get_many(bench, fake):
+    names = [f"runs/{i}" for i in range(25)] + ["runs/missing"]
+    values = bench.get_many(names)
+    assert len(values) == 25
+    assert values["runs/24"] == "24"
+    assert fake.calls["get_parameters"] == 3
+    bench.get_many(names[:10])
+    assert fake.calls["get_parameters"] == 3
+
+
+def test_fetch_many(bench, fake):
+    names = [f"runs/{i}" for i in range(12)] + ["runs/missing"]
+    values = bench.fetch_many(names)
+    assert len(values) == 12 and values["runs/11"] == "11"
+    bench.fetch_many(names)
+    assert fake.calls["get_parameters"] == 4
+
+
+def test_keys(bench, fake):
+    assert sorted(bench.keys()) == ["config", "runs"]
+    assert fake.calls["describe_parameters"] == N_PARAMETERS // 50 + 1
+
+
+def test_benchmark_membership(bench, fake):
+    start = time.perf_counter()
+    for i in range(0, N_PARAMETERS, 100):
+        assert f"runs/{i}" in bench
+    lazy = time.perf_counter() - start
+    lazy_calls = sum(fake.calls.values())
+
+    fake.calls.clear()
+    start = time.perf_counter()
+    bench.refresh()
+    listing = time.perf_counter() - start
+    print(f"100 lookups: {lazy_calls} calls in {lazy:.4f}s")
+    print(f"full refresh: {sum(fake.calls.values())} calls in {listing:.4f}s")
+    assert lazy_calls == 100
+    assert sum(fake.calls.values()) > lazy_calls
+
+
+def test_value_ttl(fake, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    store = SSMParameterStore("Bench", ttl=60)
+    store._client = fake
+    assert store["config"] == "yes"
+    fake.parameters["/Bench/config"] = "no"
+    assert store["config"] == "yes"
+    now[0] += 60
+    assert store["config"] == "no"
+    assert fake.calls["get_parameter"] == 2
+
+
+def test_bounded_values(fake):
+    store = SSMParameterStore("Bench", maxsize=100)
+    store._client = fake
+    store.load()
+    stats = store.stats()
+    assert stats["size"] == 100
+    assert stats["evictions"] == N_PARAMETERS + 1 - 100
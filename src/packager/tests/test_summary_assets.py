@@ -0,0 +1,48 @@
+import json
+import pytest
+
+from packager import GatkReportStream
+from packager.recal_summary import RecalSummary
+from packager.summary_assets import SummaryAssets, VEGA_LITE
+from pathlib import Path
+from .conftest import CTX
+
+
+@pytest.fixture
+def collected():
+    summary = RecalSummary()
+    assets = SummaryAssets(preview_rows=10, max_points=50)
+    for name, table in GatkReportStream(Path(CTX["REPORT"])):
+        summary.add(name, table)
+        assets.add(name, table)
+    return summary, assets
+
+
+def test_specs(collected):
+    summary, assets = collected
+    specs = assets.specs(summary)
+    assert sorted(specs) == ["recal_by_context", "recal_by_cycle", "recal_by_quality"]
+    for spec in specs.values():
+        assert spec["$schema"] == VEGA_LITE
+        assert 0 < len(spec["data"]["values"]) <= 50
+
+
+def test_write(collected, tmp_path):
+    summary, assets = collected
+    entries = assets.write(tmp_path, summary)
+    assert "RecalTable2.preview.csv" in entries
+    assert entries["recal_by_cycle.vl.json"]["title"] == "Quality delta by cycle"
+    sizes = [Path(entry["path"]).stat().st_size for entry in entries.values()]
+    assert sum(sizes) < 64 * 1024
+    preview = (tmp_path / "RecalTable2.preview.csv").read_text().splitlines()
+    assert len(preview) == 11
+    spec = json.loads((tmp_path / "recal_by_quality.vl.json").read_text())
+    assert spec["mark"]["type"] == "line"
+
+
+def test_downsample(collected):
+    summary, _ = collected
+    assert len(SummaryAssets.Downsample(summary.covariates, 100)) <= 100
+    assert len(SummaryAssets.Downsample(summary.covariates, 10_000)) == len(
+        summary.covariates
+    )